@@ -4,7 +4,10 @@ from PyQt5 import QtCore
 from numpy import ndarray
 
 from games.abstracts import *
-from games.ai.decision_rule import find_best_move
+from games.ai.config import EngineConfig
+from games.ai.search_handle import SearchHandle, ponder
+from games.ai.mcts import MonteCarloTreeSearch
+from games.ai.opening_book import OpeningBook
 
 
 GAME_CONTINUE, PLAYER_1_WIN, PLAYER_2_WIN, DRAW, BAD_MOVE = 0, 1, 2, 3, -1
@@ -15,9 +18,11 @@ class Party(QtCore.QThread):
     sendGameState = QtCore.pyqtSignal(int)
     unblockGameForm = QtCore.pyqtSignal()
     waitSignal = QtCore.pyqtSignal(bool)
+    # Pondering is stopped after this time even if the human doesn't move
+    PONDER_TIME_MS = 60000
 
     def __init__(self, board: Board, is_AI: bool, AI_player: int = None,
-                 difficulty_settings: dict = None):
+                 config: EngineConfig = None, stats_path: str = None):
         """
         A class for storing the state of the board, controlling the order of players
         and calling AI functions (in the case of playing with a computer).
@@ -25,20 +30,68 @@ class Party(QtCore.QThread):
         :param board: Initialized game board.
         :param is_AI: True if play with computer.
         :param AI_player: Number of AI player.
-        :param difficulty_settings: dictionary with difficulty settings.
+        :param config: Settings of AI (difficulty level).
+        :param stats_path: File for statistics of AI searches in json lines (statistics isn't written if it's None).
         """
         QtCore.QThread.__init__(self)
         self.isAI = is_AI
         self.board = board
-        self.difficulty_settings = difficulty_settings
+        self.config = config if config is not None else EngineConfig()
         self.AI_player = AI_player
         self.move = None
+        # Results of AI search are kept between moves
+        self.table = self.config.create_table()
+        self.tree = MonteCarloTreeSearch()
+        self.evaluation_cache = self.config.create_evaluation_cache()
+        # AI plays moves of the opening book without search
+        self.book = OpeningBook.for_game(type(board)) if self.config.book else None
+        self.stats_path = stats_path
+        # Statistics of the last AI search
+        self.stats = None
+        # Current AI search and flag of stopped party (moves of the stopped search aren't applied)
+        self.search = None
+        self.stopped = False
+        self.pondering = self.config.pondering
+        # Search on the human's time
+        self.ponder = None
 
     def start(self, move=None):
         super().start()
         self.move = move
 
+    def stop(self):
+        """Stops the party (for example, when a new game is started): AI search is cancelled and its move is lost."""
+        self.stopped = True
+        if self.search is not None:
+            self.search.cancel()
+        self.wait()
+        self.stop_pondering()
+
+    def resume(self):
+        """Continues the stopped party. AI search is started again (the transposition table is kept)."""
+        self.stopped = False
+        self.start(None)
+
+    def move_now(self):
+        """Pre-empts AI search: the best move found so far is applied."""
+        if self.search is not None:
+            self.search.cancel()
+
+    def start_pondering(self):
+        """Starts AI search on the human's time, so the table is warm when the human's move arrives."""
+        settings = dict(self.config.search_settings(), time_budget_ms=self.PONDER_TIME_MS)
+        self.ponder = ponder(self.board, self.AI_player, table=self.table, tree=self.tree,
+                            evaluation_cache=self.evaluation_cache, book=self.book, **settings)
+
+    def stop_pondering(self):
+        """Cancels the search on the human's time and waits for its end."""
+        if self.ponder is not None:
+            self.ponder.stop()
+            self.ponder = None
+
     def run(self):
+        # The table, the tree and the cache are used by AI search only after pondering is stopped
+        self.stop_pondering()
         # CHeck that move is possible
         self.waitSignal.emit(True)
         if self.move:
@@ -52,26 +105,45 @@ class Party(QtCore.QThread):
 
         # Check game state after move
         self.check_state()
+        if self.stopped:
+            return
         self.sendGameField.emit(self.board.field, self.board.legal_moves)
         self.waitSignal.emit(False)
 
     def check_state(self):
         """Check that game continue, there is winner or draw."""
+        if self.stopped:
+            return
         if self.board.is_draw:
             self.sendGameState.emit(DRAW)
         elif self.board.is_win:
-            self.sendGameState.emit(self.board.last_turn)
+            self.sendGameState.emit(self.board.winner)
         else:
             self.sendGameState.emit(GAME_CONTINUE)
             self.sendGameField.emit(self.board.field, self.board.legal_moves)
             if self.isAI and self.board.turn == self.AI_player:
                 self.do_ai_move()
             else:
+                if self.isAI and self.pondering:
+                    self.start_pondering()
                 self.unblockGameForm.emit()
 
     def do_ai_move(self):
         """Find AI's best move and apply it or wait for player move."""
         self.msleep(1000)
-        best_move = find_best_move(self.board, **self.difficulty_settings)
+        self.search = SearchHandle(self.board, table=self.table, tree=self.tree,
+                                   evaluation_cache=self.evaluation_cache, book=self.book,
+                                   **self.config.search_settings())
+        if self.stopped:
+            # The party was stopped before the search was created
+            self.search.cancel()
+        best_move = self.search.run()
+        self.stats = self.search.stats
+        self.search = None
+        if self.stopped:
+            return
+        if self.stats_path:
+            with open(self.stats_path, 'a') as file:
+                self.stats.write(file, difficulty=self.config.to_dict())
         self.board = self.board.move(best_move)
         self.check_state()
@@ -1,25 +1,102 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import annotations
+import struct
 from abc import ABC, abstractmethod
-from typing import Union
+from copy import copy
+from random import Random
+from typing import Optional, Union
 
 import numpy as np
 
 # Move is coordinates in the field
 Move = tuple[int, int]
+# Mark of the null move (passing of the turn) in the stack of records of moves made by push
+NULL_MOVE = 'null move'
+# Code of the missing location in the binary state of the board
+NO_LOCATION = 0xFFFF
+
+
+def encode_move(move: Union[Move, tuple[Move, Move]], size: int) -> int:
+    """
+    Returns integer code of the move on the board of the size: x * size + y for location,
+    from * size * size + to for pair of locations (codes of the locations).
+    Codes are stored and compared by ai instead of tuples (transposition table, killer moves, etc.).
+    """
+    if isinstance(move[0], tuple):
+        (x, y), (new_x, new_y) = move
+        return (x * size + y) * size * size + new_x * size + new_y
+    x, y = move
+    return x * size + y
+
+
+def decode_move(code: int, size: int, pair: bool = False) -> Union[Move, tuple[Move, Move]]:
+    """Returns move by its integer code (pair of locations if the moves of the game are pairs)."""
+    if pair:
+        start, end = divmod(code, size * size)
+        return divmod(start, size), divmod(end, size)
+    return divmod(code, size)
+
+
+def encode_location(location: Optional[Move], size: int) -> int:
+    """Returns code of the location (or NO_LOCATION for None) for the binary state of the board."""
+    return NO_LOCATION if location is None else encode_move(location, size)
+
+
+def decode_location(code: int, size: int) -> Optional[Move]:
+    return None if code == NO_LOCATION else divmod(code, size)
+
+
+def pack_field(field: np.ndarray, bits: int = 2) -> bytes:
+    """Packs codes of the cells row by row, the code of every cell takes the number of bits."""
+    codes = field.astype(np.uint8).reshape(-1, 1)
+    # Bits of every code from the highest one, only the lower bits are kept
+    return np.packbits(np.unpackbits(codes, axis=1)[:, 8 - bits:]).tobytes()
+
+
+def unpack_field(data: bytes, size: int, bits: int = 2) -> np.ndarray:
+    """Returns int8 field of the size from the codes packed by pack_field."""
+    cell_bits = np.unpackbits(np.frombuffer(data, np.uint8), count=size * size * bits).reshape(-1, bits)
+    codes = cell_bits @ (1 << np.arange(bits - 1, -1, -1))
+    return codes.astype(np.int8).reshape(size, size)
+
+
+def empty_cells_near(field: np.ndarray) -> set[Move]:
+    """Returns empty cells adjacent to pieces (vertically, horizontally or diagonally)."""
+    size = field.shape[0]
+    occupied = np.pad(field != 0, 1)
+    near = np.zeros((size, size), dtype=bool)
+    for dx in range(3):
+        for dy in range(3):
+            near |= occupied[dx:dx + size, dy:dy + size]
+    return {(x, y) for x, y in np.argwhere(near & (field == 0)).tolist()}
 
 
 class Piece:
-    """Basic class for a board piece (or figure)."""
+    """
+    Basic class for a board piece (or figure).
+    Pieces without own state are immutable, so one instance is shared for every value (see get).
+    """
+    __slots__ = ('player',)
     EMPTY = 0
     PLAYER1 = 1
     PLAYER2 = 2
     NUM2STR = ['_', 'X', '0']
+    # Shared instances by class and arguments
+    _instances = {}
 
     def __init__(self, player: int = 0):
         self.player = player
 
+    @classmethod
+    def get(cls, *args) -> Piece:
+        """Returns shared instance of the class for the arguments (it must not be changed)."""
+        key = (cls, args)
+        piece = Piece._instances.get(key)
+        if piece is None:
+            piece = Piece._instances[key] = cls(*args)
+        return piece
+
     @staticmethod
     def opposite(player: int) -> int:
         """Returns the opposite player number."""
@@ -39,12 +116,131 @@ class Piece:
         return self.NUM2STR[self.player]
 
 
+class Zobrist:
+    """
+    Table of random keys for Zobrist hashing of boards with a given size.
+    Tables are built once per size and shared by all boards of this size.
+    """
+    VALUES = 8
+    EXTRAS = 64
+    SEED = 20211011
+    _tables = {}
+
+    def __init__(self, size: int):
+        rnd = Random(self.SEED + size)
+        self.cells = [[[rnd.getrandbits(64) for _ in range(self.VALUES)] for _ in range(size)] for _ in range(size)]
+        self.turns = [0, rnd.getrandbits(64), rnd.getrandbits(64)]
+        # Keys for game specific counters (remaining moves, turns without attack, etc.)
+        self.extras = [rnd.getrandbits(64) for _ in range(self.EXTRAS)]
+
+    @classmethod
+    def get(cls, size: int) -> Zobrist:
+        """Returns shared table for the board size."""
+        table = cls._tables.get(size)
+        if table is None:
+            table = cls._tables[size] = Zobrist(size)
+        return table
+
+
+class Geometry:
+    """
+    Tables of neighbours and rays of every cell for boards with a given size.
+    Tables are built once per size and shared by all boards of this size, so moves and evaluations
+    don't build and bounds-check the coordinates again. Tables must not be changed.
+    """
+    # Directions of the rays, the opposite directions are adjacent (rays 2k and 2k + 1)
+    DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1))
+    _tables = {}
+
+    def __init__(self, size: int):
+        self.size = size
+        # Cells from the nearest one to the border of the field for every cell and direction
+        self.rays = [[tuple(tuple(self._walk(x, y, dx, dy)) for dx, dy in self.DIRECTIONS) for y in range(size)]
+                     for x in range(size)]
+        self.orthogonal = [[tuple(ray[0] for ray in rays[:4] if ray) for rays in column] for column in self.rays]
+        self.diagonal = [[tuple(ray[0] for ray in rays[4:] if ray) for rays in column] for column in self.rays]
+        self._neighbours = {}
+
+    def _walk(self, x: int, y: int, dx: int, dy: int):
+        x, y = x + dx, y + dy
+        while 0 <= x < self.size and 0 <= y < self.size:
+            yield x, y
+            x, y = x + dx, y + dy
+
+    @classmethod
+    def get(cls, size: int) -> Geometry:
+        """Returns shared tables for the board size."""
+        table = cls._tables.get(size)
+        if table is None:
+            table = cls._tables[size] = Geometry(size)
+        return table
+
+    def neighbours(self, area_size: int = 1) -> list[list[tuple[Move, ...]]]:
+        """Returns table of locations in the square area around every cell (the cell is included)."""
+        table = self._neighbours.get(area_size)
+        if table is None:
+            size = self.size
+            table = self._neighbours[area_size] = [
+                [tuple((x - i, y - j) for i in range(-area_size, area_size + 1)
+                       for j in range(-area_size, area_size + 1)
+                       if 0 <= x - i < size and 0 <= y - j < size) for y in range(size)] for x in range(size)]
+        return table
+
+
+def cached_state(method) -> property:
+    """
+    Makes property which depends only on the state of the board and is computed once for the state.
+    The value is kept until the board is changed in place by push, pop or push_null (copy of the board
+    gets empty cache), so the property must not change the board.
+    """
+    name = method.__name__
+
+    def getter(self):
+        cache = self._state_cache
+        if cache is None:
+            cache = self._state_cache = {}
+        if name in cache:
+            return cache[name]
+        value = cache[name] = method(self)
+        return value
+
+    getter.__doc__ = method.__doc__
+    return property(getter)
+
+
 class Board(ABC):
-    """Basic class for a board of game. Contains state of board for current turn."""
+    """
+    Basic class for a board of game. Contains state of board for current turn.
+    The field is stored as int8 array of cells codes (number of player and game specific flags),
+    pieces are created only for gui.
+    """
     MAX_SCORES = 100
+    # Class of pieces in the field for gui
+    PIECE = Piece
+    # Lower bits of the cell code are number of player, higher bits are flags (king, dead, etc.)
+    PLAYER_MASK = 3
+    # True if the board can make moves in place (push and pop)
+    SUPPORTS_PUSH = False
+    # True if moves are pairs of locations (from, to), else a move is one location
+    PAIR_MOVES = False
+    # Number of bits of the flags in the cell codes (above the bits of player) and struct format of game specific
+    # state (counters, locations of the last moves, etc.) in the binary state of the board (to_bytes)
+    FLAG_BITS = 0
+    STATE_FORMAT = ''
+    # Size of the field and turn in the binary state
+    _HEADER = struct.Struct('<BB')
+    # True if passing of the turn (null move) doesn't make position of the player better, so the search
+    # may use null-move pruning. It's wrong for games with zugzwang (the player must move and loses).
+    SUPPORTS_NULL_MOVE = False
+    # Zobrist hash of field without turn and game specific counters (it's computed lazily)
+    _field_hash = None
+    # Stack of records to undo moves made by push
+    _undo = None
+    # Values of cached_state properties for the current state
+    _state_cache = None
 
     @abstractmethod
-    def __init__(self, turn: int = 1, size: int = 8, field: Union[list[list[Piece]], np.ndarray] = None):
+    def __init__(self, turn: int = 1, size: int = 8, field: np.ndarray = None):
         if field is None:
             pass
         self._field = field
@@ -58,21 +254,100 @@ class Board(ABC):
         return self._turn
 
     @property
-    def field(self):
-        return self._field
+    def field(self) -> np.ndarray:
+        """Returns field of pieces. It's necessary for gui."""
+        field = np.empty((self._size, self._size), dtype=object)
+        for x in range(self._size):
+            for y in range(self._size):
+                field[x, y] = self.to_piece(self._field[x, y])
+        return field
+
+    def to_piece(self, code: int) -> Piece:
+        """Returns piece for the code of the cell."""
+        return self.PIECE.get(int(code))
 
     @property
     def last_turn(self) -> int:
         """Returns number of previous player."""
         return Piece.opposite(self._turn)
 
-    def get_neighbours(self, location: Move, area_size: int = 1) -> list[Move]:
-        """Returns a list of adjacent locations."""
+    @property
+    def hash_key(self) -> int:
+        """Returns Zobrist hash of the position. It's necessary for ai."""
+        zobrist = Zobrist.get(self._size)
+        if self._field_hash is None:
+            self._field_hash = 0
+            for x in range(self._size):
+                for y in range(self._size):
+                    self._field_hash ^= zobrist.cells[x][y][self._field[x, y]]
+        return self._field_hash ^ zobrist.turns[self._turn] ^ self._extra_hash(zobrist)
+
+    def _extra_hash(self, zobrist: Zobrist) -> int:
+        """Returns hash of game specific state which is not stored in the field."""
+        return 0
+
+    @property
+    def evaluation_key(self) -> int:
+        """
+        Returns hash of all state which evaluate depends on. It's necessary for the evaluation cache of ai.
+        It's hash_key unless evaluation depends on history of the game (for example, on the last move).
+        """
+        return self.hash_key
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns compact binary state of the board: size and turn, game specific state (STATE_FORMAT)
+        and the field (2 bits of player and FLAG_BITS of flags for every cell). Derived state (legal moves,
+        lists of pieces, etc.) isn't stored, it's restored by from_bytes.
+        """
+        return (self._HEADER.pack(self._size, self._turn) + struct.pack('<' + self.STATE_FORMAT, *self._get_state())
+                + pack_field(self._field, 2 + self.FLAG_BITS))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Board:
+        """Returns board with the state returned by to_bytes."""
+        size, turn = cls._HEADER.unpack_from(data)
+        state_format = struct.Struct('<' + cls.STATE_FORMAT)
+        offset = cls._HEADER.size + state_format.size
+        bits = 2 + cls.FLAG_BITS
+        if len(data) != offset + (size * size * bits + 7) // 8:
+            raise ValueError('Data is not a state of %s!' % cls.__name__)
+        state = state_format.unpack_from(data, cls._HEADER.size)
+        return cls._from_state(size, turn, unpack_field(data[offset:], size, bits), state)
+
+    def _get_state(self) -> tuple:
+        """Returns values of game specific state (STATE_FORMAT) for to_bytes."""
+        return ()
+
+    @classmethod
+    def _from_state(cls, size: int, turn: int, field: np.ndarray, state: tuple) -> Board:
+        """Creates board from the binary state and restores its derived state."""
+        raise NotImplementedError
+
+    def encode_move(self, move: Union[Move, tuple[Move, Move]]) -> int:
+        """Returns integer code of the move. It's necessary for ai."""
+        return encode_move(move, self._size)
+
+    def decode_move(self, code: int) -> Union[Move, tuple[Move, Move]]:
+        """Returns move by its integer code."""
+        return decode_move(code, self._size, self.PAIR_MOVES)
+
+    def _set_cell(self, location: Move, code: int):
+        """Puts the code into the field and updates hash of the field."""
+        if self._field_hash is not None:
+            cells = Zobrist.get(self._size).cells[location[0]][location[1]]
+            self._field_hash ^= cells[self._field[location]] ^ cells[code]
+        self._field[location] = code
+
+    @property
+    def geometry(self) -> Geometry:
+        """Returns shared tables of neighbours and rays for the size of the board."""
+        return Geometry.get(self._size)
+
+    def get_neighbours(self, location: Move, area_size: int = 1) -> tuple[Move, ...]:
+        """Returns adjacent locations (the location itself is included). The tuple is shared, don't change it."""
         x, y = location
-        neighbours = ((x - i, y - j) for i in range(-area_size, area_size + 1)
-                      for j in range(-area_size, area_size + 1))
-        possible_neighbours = [(x, y) for x, y in neighbours if 0 <= x < self._size and 0 <= y < self._size]
-        return possible_neighbours
+        return Geometry.get(self._size).neighbours(area_size)[x][y]
 
     @abstractmethod
     def move(self, location: Union[Move, tuple[Move, Move]]) -> Board:
@@ -84,22 +359,142 @@ class Board(ABC):
         """
         pass
 
+    def copy(self) -> Board:
+        """Returns copy of the board which can be changed independently. Subclasses copy their mutable state."""
+        board = copy(self)
+        board._field = self._field.copy()
+        board._undo = None
+        board._state_cache = None
+        return board
+
+    def _apply(self, location: Union[Move, tuple[Move, Move]]):
+        """
+        Makes move in place.
+
+        :param location:
+        :return: record to undo the move
+        """
+        raise NotImplementedError
+
+    def _revert(self, record):
+        """Undoes the move by the record returned from _apply."""
+        raise NotImplementedError
+
+    def push(self, location: Union[Move, tuple[Move, Move]]):
+        """Makes move in place without copying of the board (it's faster for ai). The move is undone by pop."""
+        if self._undo is None:
+            self._undo = []
+        self._undo.append(self._apply(location))
+        self._state_cache = None
+
+    def pop(self):
+        """Undoes the last move made by push or push_null."""
+        record = self._undo.pop()
+        if record is NULL_MOVE:
+            self._revert_null(self._undo.pop())
+        else:
+            self._revert(record)
+        self._state_cache = None
+
+    @property
+    def can_null_move(self) -> bool:
+        """Returns True if the current player may pass the turn in the search. It's necessary for ai."""
+        return self.SUPPORTS_NULL_MOVE and bool(self._legal_moves)
+
+    def _apply_null(self):
+        """
+        Passes the turn to the opponent in place.
+
+        :return: record to undo the null move
+        """
+        raise NotImplementedError
+
+    def _revert_null(self, record):
+        """Undoes the null move by the record returned from _apply_null."""
+        raise NotImplementedError
+
+    def push_null(self):
+        """Passes the turn in place (null move of the search). The null move is undone by pop."""
+        if self._undo is None:
+            self._undo = []
+        self._undo.append(self._apply_null())
+        self._undo.append(NULL_MOVE)
+        self._state_cache = None
+
     @property
     @abstractmethod
     def is_win(self) -> bool:
-        """Returns True if player wins."""
+        """Returns True if the game is won (subclasses make it cached_state). The winner is returned by winner."""
         pass
 
     @property
+    def winner(self) -> Optional[int]:
+        """Returns number of the winner or None if the game isn't won."""
+        return self.last_turn if self.is_win else None
+
+    @cached_state
     def is_draw(self) -> bool:
         """Returns True if there are no moves and no one wins."""
         return not (self.is_win or self.legal_moves)
 
-    @property
+    @cached_state
     def legal_moves(self) -> Union[list[Move], list[tuple[Move, Move]]]:
-        """Returns list of possible and reasonable moves. It's necessary for ai."""
+        """Returns list of possible and reasonable moves. It's necessary for ai. The list is shared, don't change it."""
         return list(self._legal_moves)
 
+    def is_forcing(self, move: Union[Move, tuple[Move, Move]]) -> bool:
+        """
+        Returns True if the move changes balance of the game (capture, kill, etc.), so the position
+        can't be estimated before the answer. Forcing moves are searched by the quiescence search.
+        """
+        return False
+
+    def order_moves(self, moves: list) -> list:
+        """Returns moves in static order of the game (the most promising first). It's necessary for ai."""
+        return moves
+
+    @property
+    def empty_count(self) -> Optional[int]:
+        """
+        Returns number of empty cells if the game ends when the field is filled, else None.
+        It's necessary for the endgame solver of ai.
+        """
+        return None
+
+    def final_scores(self, player: int) -> float:
+        """Returns exact result of the finished game for the player (it's necessary for the endgame solver)."""
+        raise NotImplementedError
+
+    def order_endgame_moves(self, moves: list) -> list:
+        """Returns moves in order of the endgame solver (the most promising first)."""
+        return self.order_moves(moves)
+
+    def _order_by_parity(self, moves: list[Move]) -> list[Move]:
+        """
+        Returns moves in empty regions with odd number of cells first (the player gets the last move
+        in such region) and moves in smaller regions first.
+        """
+        region_sizes = {}
+        for x, y in np.argwhere(self._field == 0).tolist():
+            if (x, y) in region_sizes:
+                continue
+            region = [(x, y)]
+            region_sizes[x, y] = 0
+            for cell in region:
+                for neighbour in self.get_neighbours(cell):
+                    if neighbour not in region_sizes and self._field[neighbour] == 0:
+                        region_sizes[neighbour] = 0
+                        region.append(neighbour)
+            for cell in region:
+                region_sizes[cell] = len(region)
+
+        def priority(move):
+            size = region_sizes.get(move, 0)
+            return size % 2 == 0, size
+
+        # Sorting is stable, so static order of the game is kept for moves with equal priority
+        return sorted(moves, key=priority)
+
     @abstractmethod
     def evaluate(self, player: int) -> float:
         """Evaluate state of board for current player and returns estimation of scores. It's necessary for ai."""
@@ -107,7 +502,7 @@ class Board(ABC):
 
     def get_value(self, x: int, y: int) -> int:
         """Returns value from field"""
-        return self._field[x][y].value
+        return self.to_piece(self._field[x, y]).value
 
     def __str__(self):
-        return self._field.__str__()
+        return self.field.__str__()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Analysis of the position: the best moves with their scores and principal variations"""
+
+from typing import NamedTuple
+
+from games.abstracts import *
+from games.ai.decision_rule import search_root_multipv, SearchContext, SearchTimeout, PLAYER_KEYS
+from games.ai.evaluation_cache import EvaluationCache
+from games.ai.stats import SearchStats
+from games.ai.transposition import TranspositionTable
+
+
+class MoveAnalysis(NamedTuple):
+    """Move of the player with its exact scores and the expected continuation of the game."""
+    move: Union[Move, tuple[Move, Move]]
+    scores: float
+    # Principal variation: the move and the best answers found by the search
+    pv: list
+
+
+def principal_variation(board: Board, move: Union[Move, tuple[Move, Move]], player: int,
+                        table: TranspositionTable, length: int) -> list:
+    """
+    Returns the move and the best moves after it stored in the transposition table.
+
+    :param board: Current state of game.
+    :param move: The first move of the variation.
+    :param player: Number of player, who searched the position.
+    :param table: Transposition table of the search.
+    :param length: Max number of moves after the first move.
+    :return: List of moves.
+    """
+    pv = [move]
+    board = board.move(move)
+    seen = {board.hash_key}
+    while len(pv) <= length and not (board.is_win or board.is_draw):
+        entry = table.get(board.hash_key ^ PLAYER_KEYS[player])
+        if entry is None or entry[4] is None:
+            break
+        move = board.decode_move(entry[4])
+        # Different positions may have equal hashes
+        if move not in board.legal_moves:
+            break
+        pv.append(move)
+        board = board.move(move)
+        if board.hash_key in seen:
+            # The variation is repeated
+            break
+        seen.add(board.hash_key)
+    return pv
+
+
+def analyse(board: Board, max_depth: int = 2, count: int = 3, table: TranspositionTable = None,
+            time_budget_ms: int = None, node_budget: int = None, algorithm: str = 'alphabeta',
+            quiescence_depth: int = 0, stats: SearchStats = None,
+            evaluation_cache: EvaluationCache = None) -> list[MoveAnalysis]:
+    """
+    Searches the position (Multi-PV) and returns the best moves with exact scores and principal variations.
+    If time or nodes budget is given then iterative deepening is used like in find_best_move.
+
+    :param board: Current state of game
+    :param max_depth: How deep to provide a search
+    :param count: Number of the best moves.
+    :param table: Transposition table (it may be kept between moves of the party).
+    :param time_budget_ms: Time limit of the search in milliseconds.
+    :param node_budget: Limit of visited nodes.
+    :param algorithm: 'alphabeta' or 'negamax'.
+    :param quiescence_depth: Max number of forcing moves searched after max_depth.
+    :param stats: Statistics of the search.
+    :param evaluation_cache: Cache of evaluations of the leaves.
+    :return: The best moves sorted by scores (the best first).
+    """
+    if algorithm not in ('alphabeta', 'negamax'):
+        raise ValueError('Unknown algorithm %s!' % algorithm)
+    if table is None:
+        table = TranspositionTable()
+    table.new_search()
+    context = SearchContext(table, time_budget_ms, node_budget, stats, quiescence_depth=quiescence_depth,
+                            evaluation_cache=evaluation_cache)
+    context.stats.game = type(board).__name__
+    context.stats.algorithm = algorithm
+    moves = board.order_moves(list(board.legal_moves))
+    depths = range(max_depth + 1) if time_budget_ms or node_budget else [max_depth]
+    root_scores = None
+    searched_depth = 0
+    for depth in depths:
+        nodes = context.nodes
+        try:
+            root_scores = search_root_multipv(board, moves, depth, count, context, algorithm)
+        except SearchTimeout:
+            break
+        searched_depth = depth
+        moves.sort(key=lambda move: root_scores[move], reverse=True)
+        context.stats.best_move = moves[0]
+        context.stats.add_iteration(depth, context.nodes - nodes, context.elapsed, root_scores[moves[0]])
+        if context.deadline and context.elapsed * 2 > context.deadline - context.start_time:
+            break
+    context.stats.nodes = context.nodes
+    context.stats.elapsed = context.elapsed
+    if root_scores is None:
+        # Even the first iteration isn't completed
+        return []
+    return [MoveAnalysis(move, root_scores[move], principal_variation(board, move, board.turn, table, searched_depth))
+            for move in moves[:count]]
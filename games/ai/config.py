@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Configuration of the computer player: the search, its limits, caches and the choice of the move"""
+
+from __future__ import annotations
+import json
+import os
+from dataclasses import dataclass, asdict, fields, replace
+from typing import Optional, TextIO
+
+from games.ai.decision_rule import Pruning
+from games.ai.evaluation_cache import EvaluationCache
+from games.ai.transposition import TranspositionTable, SharedTranspositionTable
+
+ALGORITHMS = ('alphabeta', 'negamax', 'mcts')
+PARALLEL_SEARCHES = ('lazy', 'root')
+# Default directory of the files with the engine profiles of the games
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            'resources', 'profiles')
+
+
+@dataclass(frozen=True)
+class EngineConfig:
+    """
+    Settings of the computer player (difficulty level or performance profile).
+    The config is validated when it's created and can be saved as json.
+    """
+    # 'alphabeta', 'negamax' or 'mcts'
+    algorithm: str = 'alphabeta'
+    # Depth of the search (the last depth of iterative deepening if the search is limited by budget)
+    max_depth: int = 0
+    time_budget_ms: Optional[int] = None
+    node_budget: Optional[int] = None
+    # Number of playouts of Monte Carlo Tree Search
+    playouts: Optional[int] = None
+    # Max number of forcing moves searched after max_depth
+    quiescence_depth: int = 0
+    # Number of slots in the transposition table
+    table_size: int = 2 ** 16
+    # Number of evaluations in the evaluation cache (0 for no cache)
+    evaluation_cache_size: int = 2 ** 16
+    # Number of processes of the search and 'lazy' (Lazy SMP) or 'root' (split of the root moves)
+    workers: int = 1
+    parallel: str = 'lazy'
+    # Forward pruning of alphabeta
+    null_move: bool = False
+    late_move_reduction: bool = False
+    # Temperature of the move sampling in parts of board's MAX_SCORES (0 for the best move)
+    temperature: float = 0
+    # Use the opening book of the game
+    book: bool = False
+    # Solve the game to the end when the field has at most this number of empty cells (0 for no solver)
+    endgame_empties: int = 0
+    # Solver searches the exact result, else only win, loss or draw
+    endgame_exact: bool = True
+    # Search on the opponent's time
+    pondering: bool = False
+
+    def __post_init__(self):
+        if self.algorithm not in ALGORITHMS:
+            raise ValueError('Unknown algorithm %s!' % self.algorithm)
+        if self.parallel not in PARALLEL_SEARCHES:
+            raise ValueError('Unknown parallel search %s!' % self.parallel)
+        for name in ('max_depth', 'quiescence_depth', 'evaluation_cache_size', 'endgame_empties'):
+            if getattr(self, name) < 0:
+                raise ValueError('%s must not be negative!' % name)
+        for name in ('time_budget_ms', 'node_budget', 'playouts'):
+            if getattr(self, name) is not None and getattr(self, name) <= 0:
+                raise ValueError('%s must be positive!' % name)
+        if self.table_size <= 0:
+            raise ValueError('table_size must be positive!')
+        if self.workers < 1:
+            raise ValueError('Number of workers must be at least 1!')
+        if self.temperature < 0:
+            raise ValueError('Temperature must not be negative!')
+        if self.algorithm == 'negamax' and self.workers > 1 and self.parallel == 'root':
+            raise ValueError('Parallel search is supported only by alphabeta!')
+        if self.algorithm != 'alphabeta' and (self.null_move or self.late_move_reduction):
+            raise ValueError('Forward pruning is supported only by alphabeta!')
+
+    @property
+    def pruning(self) -> Optional[Pruning]:
+        """Returns forward pruning of the search or None if it's turned off."""
+        if not (self.null_move or self.late_move_reduction):
+            return None
+        return Pruning(null_move=self.null_move, late_move_reduction=self.late_move_reduction)
+
+    def search_settings(self) -> dict:
+        """Returns arguments of find_best_move (the table, the cache and the book are created by the caller)."""
+        return {
+            'algorithm': self.algorithm,
+            'max_depth': self.max_depth,
+            'time_budget_ms': self.time_budget_ms,
+            'node_budget': self.node_budget,
+            'playouts': self.playouts,
+            'quiescence_depth': self.quiescence_depth,
+            'workers': self.workers,
+            'parallel': self.parallel,
+            'pruning': self.pruning,
+            'temperature': self.temperature,
+            'endgame_empties': self.endgame_empties,
+            'endgame_exact': self.endgame_exact,
+        }
+
+    def create_table(self) -> TranspositionTable:
+        """Returns transposition table of the search (Lazy SMP needs the table in shared memory)."""
+        if self.workers > 1 and self.parallel == 'lazy':
+            return SharedTranspositionTable(self.table_size)
+        return TranspositionTable(self.table_size)
+
+    def create_evaluation_cache(self) -> Optional[EvaluationCache]:
+        return EvaluationCache(self.evaluation_cache_size) if self.evaluation_cache_size else None
+
+    def replace(self, **changes) -> EngineConfig:
+        """Returns copy of the config with changed settings (it's validated again)."""
+        return replace(self, **changes)
+
+    def to_dict(self) -> dict:
+        """Returns settings as dictionary of json types."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, settings: dict) -> EngineConfig:
+        """Creates config from dictionary (missed settings get default values)."""
+        names = {field.name for field in fields(cls)}
+        unknown = set(settings) - names
+        if unknown:
+            raise ValueError('Unknown settings %s!' % ', '.join(sorted(unknown)))
+        return cls(**settings)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text: str) -> EngineConfig:
+        return cls.from_dict(json.loads(text))
+
+
+def profile_path(board_class: type, profiles_dir: str = PROFILES_DIR) -> str:
+    """Returns path of the file with the profiles of the game."""
+    return os.path.join(profiles_dir, board_class.__name__ + '.json')
+
+
+def load_profiles(file: TextIO) -> dict[str, EngineConfig]:
+    """Reads json object with configs by names of the profiles (difficulty levels)."""
+    return {name: EngineConfig.from_dict(settings) for name, settings in json.load(file).items()}
+
+
+def save_profiles(profiles: dict[str, EngineConfig], file: TextIO):
+    """Writes configs by names of the profiles as json object."""
+    json.dump({name: config.to_dict() for name, config in profiles.items()}, file, ensure_ascii=False, indent=4)
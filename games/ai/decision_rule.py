@@ -1,13 +1,134 @@
 # -*- coding: utf-8 -*-
 """A set of functions for making a decision by the computer during the selection of a move"""
 
-from random import shuffle, randint
+from math import inf, nextafter
+from random import Random
+from threading import Event
+from time import perf_counter
+from typing import NamedTuple
 
 from games.abstracts import *
+from games.ai.evaluation_cache import EvaluationCache
+from games.ai.mcts import MonteCarloTreeSearch
+from games.ai.opening_book import OpeningBook
+from games.ai.ordering import MoveOrdering
+from games.ai.selection import softmax_select
+from games.ai.stats import SearchStats
+from games.ai.transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# Scores are stored in the transposition table from original player's point of view,
+# so hash of the position is mixed with the key of original player.
+_rnd = Random(Zobrist.SEED)
+PLAYER_KEYS = (0, _rnd.getrandbits(64), _rnd.getrandbits(64))
+# Random generator of the searches without own generator
+_rng = Random()
+# Half width of the aspiration window in parts of board's MAX_SCORES
+ASPIRATION_WINDOW = 0.1
+# Moves worse than the best one by this number of temperatures are not sampled (their weight is below exp(-4))
+SAMPLING_CUTOFF = 4
+# Bounds of the table entry from the opponent's point of view
+_OPPOSITE_BOUNDS = (EXACT, UPPER, LOWER)
+
+
+class Pruning(NamedTuple):
+    """
+    Forward pruning of alphabeta search. It makes the search faster, but the best move may be missed,
+    so every feature is turned off by default.
+    """
+    # The player passes the turn (if Board.can_null_move) and the node is cut off if the reduced search
+    # of the opponent's reply doesn't make the player's position worse than the bound
+    null_move: bool = False
+    # Depth of the null move search is reduced by this number of plies besides the null move itself
+    null_move_reduction: int = 2
+    # Cutoffs of nodes with at least this depth are verified by the search without null move
+    verification_depth: int = 5
+    # Moves after the first ones are probed with reduced depth and searched fully only if they are good
+    late_move_reduction: bool = False
+    # Number of the first moves, which are always searched with full depth
+    late_move_index: int = 3
+    # Min depth of the node for reductions of late moves
+    late_move_min_depth: int = 3
+
+
+class SearchTimeout(Exception):
+    """Raised inside of the search when its time or nodes budget is exhausted."""
+    pass
+
+
+class SearchCancelled(SearchTimeout):
+    """Raised inside of the search when it's cancelled from other thread."""
+    pass
+
+
+class SearchContext:
+    """
+    State shared by all nodes of one search: transposition table, evaluation cache, move ordering,
+    limits and counters.
+    """
+    # How often the clock is checked
+    CHECK_EVERY = 64
+
+    def __init__(self, table: TranspositionTable = None, time_budget_ms: int = None, node_budget: int = None,
+                 stats: SearchStats = None, cancel_event: Event = None, quiescence_depth: int = 0,
+                 evaluation_cache: EvaluationCache = None, pruning: Pruning = None):
+        """
+        :param table: Transposition table with results of already searched positions.
+        :param time_budget_ms: Search is stopped after this number of milliseconds.
+        :param node_budget: Search is stopped after visiting this number of nodes.
+        :param stats: Statistics of the search.
+        :param cancel_event: Search is stopped when the event is set.
+        :param quiescence_depth: Max number of forcing moves searched after the max depth (0 for no quiescence).
+        :param evaluation_cache: Cache of evaluations of the leaves.
+        :param pruning: Forward pruning of alphabeta.
+        """
+        self.table = table
+        self.stats = stats if stats is not None else SearchStats()
+        self.ordering = MoveOrdering()
+        self.start_time = perf_counter()
+        self.deadline = self.start_time + time_budget_ms / 1000 if time_budget_ms else None
+        self.node_budget = node_budget
+        self.cancel_event = cancel_event
+        self.quiescence_depth = quiescence_depth
+        self.evaluation_cache = evaluation_cache
+        self.pruning = pruning if pruning is not None else Pruning()
+        # Null move is searched only once in a line of moves
+        self.null_move_allowed = True
+        self.nodes = 0
+        # Scores of the best root move of the last completed iteration (center of the aspiration window)
+        self.scores = None
+
+    @property
+    def elapsed(self) -> float:
+        """Returns seconds since the start of the search."""
+        return perf_counter() - self.start_time
+
+    @property
+    def is_cancelled(self) -> bool:
+        """Returns True if the search is cancelled."""
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def visit(self):
+        """Counts the node and stops the search if the budget is exhausted or the search is cancelled."""
+        self.nodes += 1
+        if self.node_budget and self.nodes > self.node_budget:
+            raise SearchTimeout()
+        if self.nodes % self.CHECK_EVERY == 0:
+            if self.deadline and perf_counter() > self.deadline:
+                raise SearchTimeout()
+            if self.is_cancelled:
+                raise SearchCancelled()
+
+    def evaluate(self, board: Board, player: int) -> float:
+        """Counts the leaf and returns evaluation of the board (from the cache if it's given)."""
+        self.stats.leaves += 1
+        if self.evaluation_cache is None:
+            return board.evaluate(player)
+        return self.evaluation_cache.evaluate(board, player)
 
 
 def alphabeta(board: Board, original_player: int, depth: int = 8,
-              alpha: float = float('-inf'), beta: float = float('inf')) -> float:
+              alpha: float = float('-inf'), beta: float = float('inf'),
+              context: SearchContext = None, ply: int = 1) -> float:
     """
     Returns the score of the field after the original player's move,
     taking into account the possible moves of the player and the opponent.
@@ -18,54 +139,635 @@ def alphabeta(board: Board, original_player: int, depth: int = 8,
     :param depth: How many steps in depth function will do.
     :param alpha: Max scores of best player move.
     :param beta: Min scores of best opponent move.
+    :param context: Transposition table, limits and counters of the search.
+    :param ply: Distance from the root of the search.
     :return: estimation of first player's scores.
     """
+    if context is None:
+        context = SearchContext()
+    context.visit()
+    table = context.table
     if board.is_draw:
         return 0
+    if depth == 0 and context.quiescence_depth and not board.is_win:
+        # Forcing moves are searched until the position is quiet
+        return quiescence(board, original_player, alpha, beta, context, ply)
     if board.is_win or depth == 0:
         # If max depth is reached then stop and return current evaluate of scores for player.
-        return board.evaluate(original_player)
+        return context.evaluate(board, original_player)
+    stored_move = None
+    if table is not None:
+        key = board.hash_key ^ PLAYER_KEYS[original_player]
+        scores, stored_move = table.lookup(key, depth, alpha, beta)
+        if scores is not None:
+            return scores
+    pruning = context.pruning
+    if (pruning.null_move and context.null_move_allowed and depth > pruning.null_move_reduction
+            and board.SUPPORTS_PUSH and board.can_null_move):
+        scores = null_move_search(board, original_player, depth, alpha, beta, context, ply)
+        if scores is not None:
+            return scores
+    # Stored best move, killer moves and moves with good history are searched first for earlier cutoffs
+    moves = context.ordering.order(board, board.legal_moves, ply, stored_move)
+    best_move = None
+    original_alpha, original_beta = alpha, beta
+    reduce_late_moves = pruning.late_move_reduction and depth >= pruning.late_move_min_depth
     if board.turn == original_player:
         # Player want to do best move and max his scores.
-        for move in board.legal_moves:
-            # There will be next level of depth.
-            scores = alphabeta(board.move(move), original_player, depth-1, alpha, beta)
+        for index, move in enumerate(moves):
+            scores = None
+            if reduce_late_moves and index >= pruning.late_move_index and alpha > -inf and not board.is_forcing(move):
+                # Late move is probed with reduced depth and null window, it's searched fully if it's better
+                scores = search_move(board, move, original_player, depth-2, alpha, nextafter(alpha, inf),
+                                     context, ply+1)
+                if scores > alpha:
+                    scores = None
+            if scores is None:
+                # There will be next level of depth.
+                scores = search_move(board, move, original_player, depth-1, alpha, beta, context, ply+1)
+            if scores > alpha or best_move is None:
+                best_move = move
             alpha = max(scores, alpha)
             if alpha >= beta:
+                context.ordering.cutoff(board, move, ply, depth)
+                context.stats.cutoff(ply)
                 break
-        return alpha
+        result = alpha
     else:
         # Opponent want to do best move and min player's scores.
-        for move in board.legal_moves:
-            # There will be next level of depth.
-            scores = alphabeta(board.move(move), original_player, depth-1, alpha, beta)
+        for index, move in enumerate(moves):
+            scores = None
+            if reduce_late_moves and index >= pruning.late_move_index and beta < inf and not board.is_forcing(move):
+                scores = search_move(board, move, original_player, depth-2, nextafter(beta, -inf), beta,
+                                     context, ply+1)
+                if scores < beta:
+                    scores = None
+            if scores is None:
+                # There will be next level of depth.
+                scores = search_move(board, move, original_player, depth-1, alpha, beta, context, ply+1)
+            if scores < beta or best_move is None:
+                best_move = move
             beta = min(scores, beta)
             if alpha >= beta:
+                context.ordering.cutoff(board, move, ply, depth)
+                context.stats.cutoff(ply)
                 break
-        return beta
+        result = beta
+    if table is not None:
+        if result <= original_alpha:
+            bound = UPPER
+        elif result >= original_beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        table.store(key, depth, result, bound, None if best_move is None else board.encode_move(best_move))
+    return result
+
+
+def null_move_search(board: Board, original_player: int, depth: int, alpha: float, beta: float,
+                     context: SearchContext, ply: int) -> Optional[float]:
+    """
+    Null-move pruning: the current player passes the turn and the reply of the opponent is searched
+    with reduced depth and null window at the bound. If the position is still good enough for the cutoff,
+    then any real move would be even better (unless there is zugzwang, see Board.SUPPORTS_NULL_MOVE).
+
+    :param board: State of game, which supports push (the null move is made in place).
+    :param original_player: Number of first player, who did first move.
+    :param depth: Remaining depth of the node.
+    :param alpha: Max scores of best player move.
+    :param beta: Min scores of best opponent move.
+    :param context: Transposition table, limits and counters of the search.
+    :param ply: Distance from the root of the search.
+    :return: Bound of the cutoff or None if the node must be searched.
+    """
+    pruning = context.pruning
+    is_player = board.turn == original_player
+    bound = beta if is_player else alpha
+    if abs(bound) == inf:
+        return None
+    window = (nextafter(beta, -inf), beta) if is_player else (alpha, nextafter(alpha, inf))
+    context.null_move_allowed = False
+    try:
+        board.push_null()
+        try:
+            scores = alphabeta(board, original_player, depth - 1 - pruning.null_move_reduction, *window, context, ply+1)
+        finally:
+            board.pop()
+        if (scores >= beta if is_player else scores <= alpha) and depth >= pruning.verification_depth:
+            # The cutoff is verified by the reduced search of real moves
+            scores = alphabeta(board, original_player, depth - pruning.null_move_reduction, *window, context, ply)
+    finally:
+        context.null_move_allowed = True
+    if scores >= beta if is_player else scores <= alpha:
+        context.stats.cutoff(ply)
+        return bound
+    return None
+
+
+def quiescence(board: Board, original_player: int, alpha: float, beta: float,
+               context: SearchContext, ply: int, depth: int = None) -> float:
+    """
+    Searches only forcing moves (Board.is_forcing) after the max depth, so the position isn't estimated
+    in the middle of an exchange. If the player can refuse forcing moves, the estimation of the position
+    is the bound of the player's scores (stand pat). Mandatory forcing moves (captures in checkers) are searched all.
+
+    :param board: State of game after player's move.
+    :param original_player: Number of first player, who did first move.
+    :param alpha: Max scores of best player move.
+    :param beta: Min scores of best opponent move.
+    :param context: Transposition table, limits and counters of the search.
+    :param ply: Distance from the root of the search.
+    :param depth: Max number of forcing moves (context.quiescence_depth if it's None).
+    :return: estimation of first player's scores.
+    """
+    if depth is None:
+        depth = context.quiescence_depth
+    context.visit()
+    if board.is_draw:
+        return 0
+    legal_moves = board.legal_moves
+    moves = [move for move in legal_moves if board.is_forcing(move)]
+    if board.is_win or depth == 0 or not moves:
+        return context.evaluate(board, original_player)
+    is_player = board.turn == original_player
+    if len(moves) < len(legal_moves):
+        # Stand pat: the player may do a quiet move instead of forcing ones
+        scores = context.evaluate(board, original_player)
+        if is_player:
+            alpha = max(scores, alpha)
+        else:
+            beta = min(scores, beta)
+        if alpha >= beta:
+            return alpha if is_player else beta
+    for move in board.order_moves(moves):
+        scores = search_move(board, move, original_player, alpha, beta, context, ply+1, depth-1, search=quiescence)
+        if is_player:
+            alpha = max(scores, alpha)
+        else:
+            beta = min(scores, beta)
+        if alpha >= beta:
+            context.stats.cutoff(ply)
+            break
+    return alpha if is_player else beta
+
+
+def search_move(board: Board, move: Union[Move, tuple[Move, Move]], *args, search=alphabeta) -> float:
+    """
+    Makes move and returns alphabeta estimation of the new state.
+    The move is made in place if the board supports it, so the board isn't copied.
+
+    :param board: Current state of game.
+    :param move: Move to search.
+    :param args: Other arguments of alphabeta.
+    :param search: Function of the search (alphabeta or quiescence).
+    :return: estimation of first player's scores.
+    """
+    if not board.SUPPORTS_PUSH:
+        return search(board.move(move), *args)
+    board.push(move)
+    try:
+        return search(board, *args)
+    finally:
+        board.pop()
+
+
+def negamax(board: Board, original_player: int, depth: int = 8,
+            alpha: float = -inf, beta: float = inf,
+            context: SearchContext = None, ply: int = 1) -> float:
+    """
+    Principal variation search in negamax form. Scores of the original player are negated
+    for the opponent, so the same code works for both players. The first move of the node
+    is searched with the full window, the other moves are probed with the null window
+    (is the move better than alpha?) and searched again only if the probe fails high.
+
+    :param board: State of game after player's move.
+    :param original_player: Number of first player, who did first move.
+    :param depth: How many steps in depth function will do.
+    :param alpha: Max scores of the current player.
+    :param beta: Min scores of the opponent.
+    :param context: Transposition table, limits and counters of the search.
+    :param ply: Distance from the root of the search.
+    :return: estimation of scores of the current player (board.turn).
+    """
+    if context is None:
+        context = SearchContext()
+    context.visit()
+    table = context.table
+    sign = 1 if board.turn == original_player else -1
+    if board.is_draw:
+        return 0
+    if depth == 0 and context.quiescence_depth and not board.is_win:
+        if sign == 1:
+            return quiescence(board, original_player, alpha, beta, context, ply)
+        return -quiescence(board, original_player, -beta, -alpha, context, ply)
+    if board.is_win or depth == 0:
+        return sign * context.evaluate(board, original_player)
+    stored_move = None
+    if table is not None:
+        # Table keeps scores from original player's point of view (it may be shared with alphabeta)
+        key = board.hash_key ^ PLAYER_KEYS[original_player]
+        if sign == 1:
+            scores, stored_move = table.lookup(key, depth, alpha, beta)
+        else:
+            scores, stored_move = table.lookup(key, depth, -beta, -alpha)
+        if scores is not None:
+            return sign * scores
+    moves = context.ordering.order(board, board.legal_moves, ply, stored_move)
+    best_scores = -inf
+    best_move = None
+    original_alpha = alpha
+    for move in moves:
+        if best_move is None:
+            scores = negamax_move(board, move, original_player, depth-1, alpha, beta, context, ply+1)
+        else:
+            scores = negamax_move(board, move, original_player, depth-1, alpha, nextafter(alpha, inf),
+                                  context, ply+1)
+            if alpha < scores < beta:
+                scores = negamax_move(board, move, original_player, depth-1, alpha, beta, context, ply+1)
+        if scores > best_scores:
+            best_scores = scores
+            best_move = move
+        alpha = max(scores, alpha)
+        if alpha >= beta:
+            context.ordering.cutoff(board, move, ply, depth)
+            context.stats.cutoff(ply)
+            break
+    if table is not None:
+        if best_scores <= original_alpha:
+            bound = UPPER
+        elif best_scores >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        if sign == -1:
+            bound = _OPPOSITE_BOUNDS[bound]
+        table.store(key, depth, sign * best_scores, bound,
+                    None if best_move is None else board.encode_move(best_move))
+    return best_scores
+
 
+def negamax_move(board: Board, move: Union[Move, tuple[Move, Move]], original_player: int, depth: int,
+                 alpha: float, beta: float, context: SearchContext, ply: int) -> float:
+    """
+    Makes move and returns negamax estimation of the new state for the player, who did the move.
+    The player can keep the turn after the move (chain of attacks, several moves in turn),
+    then the estimation and the window are not negated.
+
+    :param board: Current state of game.
+    :param move: Move to search.
+    :return: estimation of scores of the current player (board.turn).
+    """
+    player = board.turn
+    if board.SUPPORTS_PUSH:
+        board.push(move)
+        child = board
+    else:
+        child = board.move(move)
+    try:
+        if child.turn == player:
+            return negamax(child, original_player, depth, alpha, beta, context, ply)
+        return -negamax(child, original_player, depth, -beta, -alpha, context, ply)
+    finally:
+        if board.SUPPORTS_PUSH:
+            board.pop()
+
+
+def find_best_move(board: Board, max_depth: int = 0, temperature: float = 0, table: TranspositionTable = None,
+                   time_budget_ms: int = None, node_budget: int = None,
+                   workers: int = 1, algorithm: str = 'alphabeta', playouts: int = None,
+                   tree: MonteCarloTreeSearch = None, return_stats: bool = False,
+                   stats: SearchStats = None, cancel_event: Event = None, quiescence_depth: int = 0,
+                   parallel: str = 'lazy', rng: Random = None, evaluation_cache: EvaluationCache = None,
+                   book: OpeningBook = None, pruning: Pruning = None, endgame_empties: int = 0,
+                   endgame_exact: bool = True) -> Union[Move, tuple[Move, Move], tuple[object, SearchStats]]:
+    """
+    Uses MiniMax and AlphaBeta algorithms (or Monte Carlo Tree Search) to select best move.
+    If time or nodes budget is given then iterative deepening is used: depths 0, 1, ..., max_depth
+    are searched in turn until the budget is exhausted, and the best move of the last completed
+    iteration is returned. Negamax always uses iterative deepening, because the scores of
+    the previous iteration are the center of the aspiration window.
 
-def find_best_move(board: Board, max_depth: int = 0, randomizing: int = 0) -> Union[Move, tuple[Move, Move]]:
+    :param board: Current state of game
+    :param max_depth: How deep to provide a search
+    :param temperature: Computers moves will be less logic (easier difficulty): the move is sampled by
+                        exact scores of all moves with this temperature (in parts of board's MAX_SCORES).
+    :param table: Transposition table (it may be kept between moves of the party).
+    :param time_budget_ms: Time limit of the search in milliseconds.
+    :param node_budget: Limit of visited nodes.
+    :param workers: Number of processes for parallel search.
+    :param algorithm: 'alphabeta', 'negamax' (principal variation search with aspiration windows) or 'mcts'.
+    :param playouts: Number of playouts for Monte Carlo Tree Search.
+    :param tree: Monte Carlo search tree (it may be kept between moves of the party).
+    :param return_stats: Return statistics of the search with the move.
+    :param stats: Statistics to fill during the search (the best move is updated after every iteration).
+    :param cancel_event: Search is stopped when the event is set (the best move of the completed iterations
+                         is returned).
+    :param quiescence_depth: Max number of forcing moves (captures, kills) searched after max_depth.
+    :param parallel: 'lazy' (Lazy SMP: all processes search the same root and share the transposition table)
+                     or 'root' (split of the root moves between processes).
+    :param rng: Random generator for order of equal moves and sampling (it's seeded to reproduce the search).
+    :param evaluation_cache: Cache of evaluations of the leaves (it may be kept between moves of the party).
+    :param book: Opening book. If the position is in the book then the book move is returned without search.
+    :param pruning: Forward pruning of alphabeta search (null move and late move reductions), it isn't
+                    supported by negamax and mcts.
+    :param endgame_empties: If the field has at most this number of empty cells then the game is solved
+                            to the end by the exact solver (it gets half of the time budget, the search
+                            is used if the solver doesn't finish).
+    :param endgame_exact: Solver searches the exact result, else only win, loss or draw.
+    :return: Move with maximum estimated scores (and statistics of the search if return_stats is True)
+    """
+    if pruning is not None and algorithm != 'alphabeta' and (pruning.null_move or pruning.late_move_reduction):
+        raise ValueError('Forward pruning is supported only by alphabeta!')
+    if stats is None:
+        stats = SearchStats()
+    if rng is None:
+        rng = _rng
+    stats.game = type(board).__name__
+    stats.algorithm = algorithm
+    start_time = perf_counter()
+    book_move = book.choose_move(board, rng) if book is not None else None
+    endgame_move = None
+    if book_move is None and endgame_empties:
+        # It's imported here because the solver uses the search context of this module
+        from games.ai.endgame import is_endgame, solve_endgame
+        if is_endgame(board, endgame_empties):
+            endgame_move, stats.endgame_scores = solve_endgame(
+                board, endgame_exact, time_budget_ms / 2 if time_budget_ms else None,
+                node_budget // 2 if node_budget else None, stats, cancel_event)
+            if time_budget_ms:
+                time_budget_ms = max(time_budget_ms - (perf_counter() - start_time) * 1000, 1)
+            if node_budget:
+                node_budget = max(node_budget - stats.nodes, 1)
+    if book_move is not None:
+        best_move = stats.book_move = book_move
+    elif endgame_move is not None:
+        best_move = endgame_move
+    elif algorithm == 'mcts':
+        if tree is None:
+            tree = MonteCarloTreeSearch(rng=rng)
+        elif rng is not _rng:
+            # Reused tree samples by the generator of this search, so the search is reproduced
+            tree.rng = rng
+        best_move = tree.find_best_move(board, playouts, time_budget_ms, stats, cancel_event)
+    elif algorithm in ('alphabeta', 'negamax'):
+        if table is None:
+            table = TranspositionTable()
+        table.new_search()
+        probes, hits = table.probes, table.hits
+        if evaluation_cache is not None:
+            evaluation_hits, evaluation_misses = evaluation_cache.hits, evaluation_cache.misses
+        context = SearchContext(table, time_budget_ms, node_budget, stats, cancel_event, quiescence_depth,
+                                evaluation_cache, pruning)
+        if workers > 1 and parallel == 'lazy':
+            # It's imported here because parallel search uses functions of this module
+            from games.ai.parallel import search_lazy_smp
+            best_move = search_lazy_smp(board, max_depth, context, workers, algorithm, temperature, rng)
+        elif parallel in ('lazy', 'root'):
+            best_move = search_deepening(board, max_depth, context, workers, algorithm, temperature, rng)
+        else:
+            raise ValueError('Unknown parallel search %s!' % parallel)
+        stats.nodes += context.nodes
+        stats.table_probes += table.probes - probes
+        stats.table_hits += table.hits - hits
+        if evaluation_cache is not None:
+            stats.evaluation_hits += evaluation_cache.hits - evaluation_hits
+            stats.evaluation_misses += evaluation_cache.misses - evaluation_misses
+    else:
+        raise ValueError('Unknown algorithm %s!' % algorithm)
+    stats.elapsed = perf_counter() - start_time
+    stats.best_move = best_move
+    if return_stats:
+        return best_move, stats
+    return best_move
+
+
+def search_deepening(board: Board, max_depth: int, context: SearchContext, workers: int = 1,
+                     algorithm: str = 'alphabeta', temperature: float = 0,
+                     rng: Random = None) -> Union[Move, tuple[Move, Move]]:
     """
-    Uses MiniMax and AlphaBeta algorithms to select best move.
+    Searches root moves with depths 0, 1, ..., max_depth (or only with max_depth if alphabeta
+    search isn't limited by budget) and returns the best move of the last completed iteration.
+    If temperature is given then the moves close to the best one get exact scores and the move is sampled by them.
 
     :param board: Current state of game
     :param max_depth: How deep to provide a search
-    :param randomizing: Computers moves will be less logic (easier difficulty).
-    :return: Move with maximum estimated scores
+    :param context: Transposition table, limits and counters of the search.
+    :param workers: Number of processes for parallel search of root moves (split of the root moves).
+    :param algorithm: 'alphabeta' or 'negamax'.
+    :param temperature: Temperature of the move sampling in parts of board's MAX_SCORES.
+    :param rng: Random generator.
+    :return: Move with maximum estimated scores (or sampled move)
+    """
+    if rng is None:
+        rng = _rng
+    moves = list(board.legal_moves)
+    rng.shuffle(moves)
+    # Static order of the game is applied to shuffled moves, so equal moves are still chosen randomly
+    moves = board.order_moves(moves)
+    if temperature:
+        # Sampling needs exact scores of the good moves (parallel split of the root doesn't give them)
+        def search(board, moves, depth, context):
+            return search_root_sampling(board, moves, depth, SAMPLING_CUTOFF * temperature * board.MAX_SCORES,
+                                        context, algorithm)
+    elif algorithm == 'negamax':
+        if workers > 1:
+            raise ValueError('Parallel search is supported only by alphabeta!')
+        search = search_root_negamax
+    elif workers > 1 and len(moves) > 1:
+        # It's imported here because parallel search uses alphabeta of this module
+        from games.ai.parallel import search_root_parallel
+
+        def search(*args):
+            return search_root_parallel(*args, workers=workers)
+    else:
+        search = search_root
+    depths = range(max_depth + 1)
+    if not (context.deadline or context.node_budget) and algorithm == 'alphabeta':
+        depths = [max_depth]
+    best_move = context.stats.best_move = moves[0]
+    root_scores = None
+    for depth in depths:
+        nodes = context.nodes
+        try:
+            best_move, iteration_scores = search(board, moves, depth, context)
+        except SearchTimeout:
+            break
+        root_scores = iteration_scores
+        context.stats.best_move = best_move
+        context.stats.add_iteration(depth, context.nodes - nodes, context.elapsed, root_scores[best_move])
+        # Best line of the previous iteration is searched first
+        moves.sort(key=lambda move: root_scores[move], reverse=True)
+        if context.deadline and context.elapsed * 2 > context.deadline - context.start_time:
+            # The next iteration will not be completed in the remaining time
+            break
+    if temperature and root_scores is not None:
+        best_move = softmax_select(root_scores, temperature * board.MAX_SCORES, rng)
+    return best_move
+
+
+def search_root(board: Board, moves: list, depth: int,
+                context: SearchContext) -> tuple[Union[Move, tuple[Move, Move]], dict]:
+    """
+    Estimates every move of the current player.
+    Only the best move gets exact scores, the scores of the other moves are upper bounds.
+
+    :param board: Current state of game
+    :param moves: Moves of the player in order of search.
+    :param depth: How deep to provide a search
+    :param context: Transposition table, limits and counters of the search.
+    :return: Move with maximum estimated scores and dictionary with scores of searched moves.
     """
     player = board.turn
-    moves = board.legal_moves
-    shuffle(moves)
     best_scores = float('-inf')
     best_move = moves[0]
+    root_scores = {}
     for move in moves:
-        scores = alphabeta(board.move(move), player, max_depth, alpha=best_scores)
-        if randomizing:
-            scores = scores + (board.MAX_SCORES - scores) * randint(0 + randomizing//2, 0 + randomizing) / 20
-        # print(move, scores)
+        scores = alphabeta(board.move(move), player, depth, alpha=best_scores, context=context)
+        root_scores[move] = scores
         if scores > best_scores:
             best_move = move
             best_scores = scores
-    return best_move
+    return best_move, root_scores
+
+
+def search_root_negamax(board: Board, moves: list, depth: int,
+                        context: SearchContext) -> tuple[Union[Move, tuple[Move, Move]], dict]:
+    """
+    Estimates every move of the current player by principal variation search. The search is started
+    with the aspiration window around the scores of the previous iteration. If the scores are out of
+    the window, the move is searched again with the window opened on the failed side.
+
+    :param board: Current state of game
+    :param moves: Moves of the player in order of search.
+    :param depth: How deep to provide a search
+    :param context: Transposition table, limits and counters of the search.
+    :return: Move with maximum estimated scores and dictionary with scores of searched moves.
+    """
+    # Moves are made in place, so the board of the party isn't changed during the search
+    board = board.copy()
+    alpha, beta = -inf, inf
+    previous = context.scores
+    if previous is not None and abs(previous) != inf:
+        delta = board.MAX_SCORES * ASPIRATION_WINDOW
+        alpha, beta = previous - delta, previous + delta
+    while True:
+        best_move, best_scores, root_scores = search_root_pvs(board, moves, depth, context, alpha, beta)
+        if best_scores <= alpha != -inf:
+            alpha = -inf
+        elif best_scores >= beta != inf:
+            beta = inf
+        else:
+            break
+    context.scores = best_scores
+    return best_move, root_scores
 
+
+def search_root_multipv(board: Board, moves: list, depth: int, count: int, context: SearchContext,
+                        algorithm: str = 'alphabeta') -> dict:
+    """
+    Estimates every move of the current player. Every move is searched with the window (scores of
+    the count-th best move, inf), so the scores of the best count moves are exact and the scores
+    of the other moves are upper bounds.
+
+    :param board: Current state of game
+    :param moves: Moves of the player in order of search.
+    :param depth: How deep to provide a search
+    :param count: Number of moves with exact scores.
+    :param context: Transposition table, limits and counters of the search.
+    :param algorithm: 'alphabeta' or 'negamax'.
+    :return: Dictionary with scores of the moves.
+    """
+    player = board.turn
+    root_scores = {}
+    best_scores = []
+    if algorithm == 'negamax':
+        # Moves are made in place
+        board = board.copy()
+    for move in moves:
+        bound = best_scores[count - 1] if len(best_scores) >= count else -inf
+        if algorithm == 'negamax':
+            scores = negamax_move(board, move, player, depth, bound, inf, context, 1)
+        else:
+            scores = alphabeta(board.move(move), player, depth, alpha=bound, context=context)
+        root_scores[move] = scores
+        if scores > bound:
+            best_scores.append(scores)
+            best_scores.sort(reverse=True)
+    return root_scores
+
+
+def search_root_sampling(board: Board, moves: list, depth: int, margin: float, context: SearchContext,
+                         algorithm: str = 'alphabeta') -> tuple[Union[Move, tuple[Move, Move]], dict]:
+    """
+    Estimates moves of the current player for the sampling. The first move is searched with the full window,
+    the other moves are searched with the window (best scores - margin, inf). Moves, which fail low,
+    get scores -inf (they are never sampled), the other moves get exact scores.
+
+    :param board: Current state of game
+    :param moves: Moves of the player in order of search.
+    :param depth: How deep to provide a search
+    :param margin: Moves worse than the best one by more than margin are not sampled.
+    :param context: Transposition table, limits and counters of the search.
+    :param algorithm: 'alphabeta' or 'negamax'.
+    :return: Move with maximum estimated scores and dictionary with scores of searched moves.
+    """
+    player = board.turn
+    if algorithm == 'negamax':
+        # Moves are made in place
+        board = board.copy()
+
+    def search(move, alpha, beta):
+        if algorithm == 'negamax':
+            return negamax_move(board, move, player, depth, alpha, beta, context, 1)
+        return alphabeta(board.move(move), player, depth, alpha, beta, context)
+
+    best_move = moves[0]
+    best_scores = search(best_move, -inf, inf)
+    root_scores = {best_move: best_scores}
+    for move in moves[1:]:
+        bound = best_scores - margin
+        if bound == inf:
+            # Nothing is sampled after the win
+            root_scores[move] = -inf
+            continue
+        scores = search(move, bound, inf)
+        root_scores[move] = scores
+        if scores > best_scores:
+            best_move = move
+            best_scores = scores
+    # Moves searched before the best one may be out of the final margin too
+    bound = best_scores - margin
+    for move, scores in root_scores.items():
+        if scores <= bound and move != best_move:
+            root_scores[move] = -inf
+    return best_move, root_scores
+
+
+def search_root_pvs(board: Board, moves: list, depth: int, context: SearchContext,
+                    alpha: float = -inf, beta: float = inf) -> tuple[Union[Move, tuple[Move, Move]], float, dict]:
+    """
+    Estimates every move of the current player in the window by principal variation search.
+    Only the best move gets exact scores, the scores of the other moves are upper bounds.
+
+    :return: Best move, its scores and dictionary with scores of searched moves.
+    """
+    player = board.turn
+    best_scores = -inf
+    best_move = moves[0]
+    root_scores = {}
+    for move in moves:
+        if not root_scores:
+            scores = negamax_move(board, move, player, depth, alpha, beta, context, 1)
+        else:
+            bound = max(alpha, best_scores)
+            scores = negamax_move(board, move, player, depth, bound, nextafter(bound, inf), context, 1)
+            if bound < scores < beta:
+                scores = negamax_move(board, move, player, depth, bound, beta, context, 1)
+        root_scores[move] = scores
+        if scores > best_scores:
+            best_move = move
+            best_scores = scores
+        if best_scores >= beta:
+            # Fail high, the root is searched again with the wider window
+            break
+    return best_move, best_scores, root_scores
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Exact endgame solver for the games which end when the field is filled (Reversi, Flume, Five in a row).
+When few empty cells remain, the game is searched to the end and the result is exact instead of heuristic.
+"""
+
+from math import inf
+
+from games.abstracts import *
+from games.ai.decision_rule import SearchContext, SearchTimeout
+from games.ai.stats import SearchStats
+from games.ai.transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+
+def is_endgame(board: Board, empties: int) -> bool:
+    """Returns True if the game ends when the field is filled and it has at most this number of empty cells."""
+    empty_count = board.empty_count
+    return empty_count is not None and empty_count <= empties
+
+
+def solve(board: Board, original_player: int, alpha: float, beta: float,
+          context: SearchContext, table: TranspositionTable, ply: int = 1) -> float:
+    """
+    Searches the game to the end (alphabeta without depth limit) and returns the exact result
+    of the original player (Board.final_scores) if it's inside of the window, else the bound of the window.
+
+    :param board: State of game after player's move.
+    :param original_player: Number of player, for whom the result is searched.
+    :param alpha: Max result of the player.
+    :param beta: Min result of the opponent.
+    :param context: Limits and counters of the search.
+    :param table: Table of solved positions.
+    :param ply: Distance from the root.
+    :return: Result of the player.
+    """
+    context.visit()
+    moves = board.legal_moves
+    if board.is_win or not moves:
+        context.stats.leaves += 1
+        return board.final_scores(original_player)
+    key = board.hash_key
+    entry = table.get(key)
+    if entry is not None:
+        _, _, scores, bound, _, _ = entry
+        if bound == EXACT or (bound == LOWER and scores >= beta) or (bound == UPPER and scores <= alpha):
+            return scores
+    original_alpha, original_beta = alpha, beta
+    is_player = board.turn == original_player
+    for move in board.order_endgame_moves(moves):
+        if board.SUPPORTS_PUSH:
+            board.push(move)
+            try:
+                scores = solve(board, original_player, alpha, beta, context, table, ply + 1)
+            finally:
+                board.pop()
+        else:
+            scores = solve(board.move(move), original_player, alpha, beta, context, table, ply + 1)
+        if is_player:
+            alpha = max(scores, alpha)
+        else:
+            beta = min(scores, beta)
+        if alpha >= beta:
+            context.stats.cutoff(ply)
+            break
+    result = alpha if is_player else beta
+    if result <= original_alpha:
+        bound = UPPER
+    elif result >= original_beta:
+        bound = LOWER
+    else:
+        bound = EXACT
+    table.store(key, 0, result, bound)
+    return result
+
+
+def solve_endgame(board: Board, exact: bool = True, time_budget_ms: float = None, node_budget: int = None,
+                  stats: SearchStats = None,
+                  cancel_event=None) -> tuple[Union[Move, tuple[Move, Move], None], Optional[float]]:
+    """
+    Finds the best move of the current player by the exact search to the end of the game.
+
+    :param board: Current state of game.
+    :param exact: Search the exact result (disc difference), else only win, loss or draw is searched
+                  with the window (-1, 1) around zero (it's faster, results of the games are integers).
+    :param time_budget_ms: Time limit of the solver in milliseconds.
+    :param node_budget: Limit of visited nodes.
+    :param stats: Statistics of the search.
+    :param cancel_event: Solver is stopped when the event is set.
+    :return: The best move and its result (or None and None if the budget is exhausted).
+    """
+    context = SearchContext(None, time_budget_ms, node_budget, stats, cancel_event)
+    table = TranspositionTable()
+    player = board.turn
+    alpha, beta = (-inf, inf) if exact else (-1, 1)
+    best_move, best_scores = None, -inf
+    try:
+        for move in board.order_endgame_moves(list(board.legal_moves)):
+            scores = solve(board.move(move), player, alpha, beta, context, table)
+            if scores > best_scores:
+                best_move, best_scores = move, scores
+            alpha = max(scores, alpha)
+            if alpha >= beta:
+                context.stats.cutoff(0)
+                break
+    except SearchTimeout:
+        return None, None
+    finally:
+        context.stats.nodes += context.nodes
+    if not exact:
+        # Bounds of the window mean win and loss
+        best_scores = max(-1, min(best_scores, 1))
+    return best_move, best_scores
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Cache of static evaluations of positions, which is used by the search at the leaves"""
+
+from collections import OrderedDict
+
+from games.abstracts import *
+
+
+class EvaluationCache:
+    """
+    Bounded LRU cache of Board.evaluate results keyed by Board.evaluation_key and number of player.
+    Unlike the transposition table it doesn't depend on the depth of the search, so it helps at the leaves
+    which are evaluated again in sibling subtrees and in the next iterations of the deepening.
+    """
+
+    def __init__(self, size: int = 2 ** 16):
+        """
+        :param size: Max number of stored evaluations (the least recently used one is removed first).
+        """
+        if size <= 0:
+            raise ValueError('Size of the cache must be positive!')
+        self._size = size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns part of the evaluations which were found in the cache."""
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, board: Board, player: int) -> float:
+        """
+        Returns the stored evaluation of the position or evaluates the board and stores the result.
+
+        :param board: State of game.
+        :param player: Number of player, for whom the position is evaluated.
+        :return: board.evaluate(player)
+        """
+        key = (board.evaluation_key, player)
+        scores = self._entries.get(key)
+        if scores is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return scores
+        self.misses += 1
+        scores = board.evaluate(player)
+        self._entries[key] = scores
+        if len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+        return scores
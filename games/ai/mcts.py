@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Monte Carlo Tree Search (UCT) for the games without good static evaluation"""
+
+from __future__ import annotations
+from collections import deque
+from itertools import count
+from math import log, sqrt
+from random import Random
+from threading import Event
+from time import perf_counter
+
+from games.abstracts import *
+from games.ai.stats import SearchStats
+
+
+class Node:
+    """Node of the search tree: state of the board with statistics of playouts through it."""
+
+    def __init__(self, board: Board, parent: Node = None, move=None):
+        """
+        :param board: State of game in the node.
+        :param parent: Previous state of game.
+        :param move: Move which leads from the parent to this node.
+        """
+        self.board = board
+        self.parent = parent
+        self.move = move
+        # Number of player, who did the move to this node
+        self.player = parent.board.turn if parent else board.last_turn
+        self.children = []
+        self.untried_moves = None
+        self.visits = 0
+        self.wins = 0.0
+        # Number of winner (0 for draw) if the node is terminal, else None
+        self.winner = None
+        if board.is_draw:
+            self.winner = 0
+        elif board.is_win:
+            self.winner = board.winner
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.winner is not None
+
+    def expand(self, rng: Random) -> Node:
+        """Adds a child for one of untried moves."""
+        if self.untried_moves is None:
+            self.untried_moves = list(self.board.legal_moves)
+        move = self.untried_moves.pop(rng.randrange(len(self.untried_moves)))
+        child = Node(self.board.move(move), self, move)
+        self.children.append(child)
+        return child
+
+    @property
+    def is_expanded(self) -> bool:
+        return self.untried_moves is not None and not self.untried_moves
+
+    def select(self, exploration: float) -> Node:
+        """Returns the child with the maximal upper confidence bound (UCT)."""
+        log_visits = log(self.visits)
+        return max(self.children,
+                   key=lambda child: child.wins / child.visits + exploration * sqrt(log_visits / child.visits))
+
+
+class MonteCarloTreeSearch:
+    """
+    Monte Carlo Tree Search with UCT selection and random playouts.
+    The tree is kept between moves, so the searched subtree of the new position is reused.
+    """
+    EXPLORATION = sqrt(2)
+    PLAYOUTS = 1000
+    # Playout is stopped after this number of moves and the board is evaluated
+    PLAYOUT_DEPTH = 80
+    # How deep the current position is searched in the old tree
+    REUSE_DEPTH = 6
+
+    def __init__(self, exploration: float = EXPLORATION, playout_depth: int = PLAYOUT_DEPTH, rng: Random = None):
+        """
+        :param exploration: Constant of the exploration in UCT formula.
+        :param playout_depth: Maximal number of moves in a playout.
+        :param rng: Random generator of expansions and playouts (it's seeded to reproduce the search).
+        """
+        self.exploration = exploration
+        self.playout_depth = playout_depth
+        self.rng = rng if rng is not None else Random()
+        self.root = None
+
+    def find_root(self, board: Board) -> Node:
+        """Returns node of the old tree with the same position or a new node."""
+        if self.root is not None:
+            key = board.hash_key
+            to_check = deque([(self.root, 0)])
+            while to_check:
+                node, depth = to_check.popleft()
+                if node.board.hash_key == key:
+                    node.parent = None
+                    return node
+                if depth < self.REUSE_DEPTH:
+                    to_check.extend((child, depth + 1) for child in node.children)
+        return Node(board)
+
+    def playout(self, board: Board) -> int:
+        """Plays random moves and returns number of the winner (0 for draw)."""
+        if board.SUPPORTS_PUSH:
+            # Moves are made in place on one copy of the board
+            board = board.copy()
+        for _ in range(self.playout_depth):
+            if board.is_draw:
+                return 0
+            if board.is_win:
+                return board.winner
+            if board.SUPPORTS_PUSH:
+                board.push(self.rng.choice(board.legal_moves))
+            else:
+                board = board.move(self.rng.choice(board.legal_moves))
+        # Game isn't finished, so the player with better estimation is the winner. Estimations of both players
+        # are compared, because evaluation of some games is never negative (Five in a row)
+        player, opponent = board.turn, Piece.opposite(board.turn)
+        scores = board.evaluate(player) - board.evaluate(opponent)
+        if scores > 0:
+            return player
+        if scores < 0:
+            return opponent
+        return 0
+
+    def find_best_move(self, board: Board, playouts: int = None,
+                       time_budget_ms: int = None, stats: SearchStats = None,
+                       cancel_event: Event = None) -> Union[Move, tuple[Move, Move]]:
+        """
+        Searches the tree and returns the most visited move.
+
+        :param board: Current state of game.
+        :param playouts: Number of playouts (it's not limited if only time budget is given).
+        :param time_budget_ms: Search is stopped after this number of milliseconds.
+        :param stats: Statistics of the search (playouts are counted as nodes).
+        :param cancel_event: Search is stopped when the event is set.
+        :return: Best move.
+        """
+        root = self.root = self.find_root(board)
+        deadline = perf_counter() + time_budget_ms / 1000 if time_budget_ms else None
+        if playouts is None and deadline is None:
+            playouts = self.PLAYOUTS
+        for i in count():
+            # Time limit and cancellation don't stop the search until there is at least one move
+            stopped = (deadline and perf_counter() > deadline) or (cancel_event is not None and cancel_event.is_set())
+            if (playouts and i >= playouts) or (stopped and root.children):
+                if stats is not None:
+                    stats.nodes += i
+                break
+            node = root
+            # Selection
+            while not node.is_terminal and node.is_expanded:
+                node = node.select(self.exploration)
+            # Expansion
+            if not node.is_terminal:
+                node = node.expand(self.rng)
+            # Simulation
+            winner = node.winner if node.is_terminal else self.playout(node.board)
+            # Backpropagation
+            while node is not None:
+                node.visits += 1
+                if winner == 0:
+                    node.wins += 0.5
+                elif winner == node.player:
+                    node.wins += 1
+                node = node.parent
+        return max(root.children, key=lambda child: child.visits).move
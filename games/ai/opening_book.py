@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Opening book: the best moves of the first positions of the game, which are searched offline.
+The book is a file with three arrays of equal length: sorted hashes of the positions, move codes and weights.
+The file is memory-mapped, so only pages touched by the binary search are read and the book isn't loaded at startup.
+
+The book of the game is built by the command (one book keeps positions of all given sizes of the board):
+python -m games.ai.opening_book <game> <size> [<size> ...]
+"""
+
+from __future__ import annotations
+import os
+import sys
+from random import Random
+
+import numpy as np
+
+from games.abstracts import *
+from games.ai.transposition import TranspositionTable
+
+# Types of the arrays of the book file (hashes are stored in a separate array for the binary search)
+KEY_TYPE, MOVE_TYPE, WEIGHT_TYPE = np.dtype('<u8'), np.dtype('<u4'), np.dtype('<u4')
+ENTRY_SIZE = KEY_TYPE.itemsize + MOVE_TYPE.itemsize + WEIGHT_TYPE.itemsize
+# Default directory of the books of the games
+BOOKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                         'resources', 'books')
+
+
+class OpeningBook:
+    """Read-only memory-mapped book. Lookup of the position is a binary search by the hash of the position."""
+
+    def __init__(self, path: str):
+        """
+        :param path: File of the book.
+        """
+        self.path = path
+        size = os.path.getsize(path)
+        if size % ENTRY_SIZE:
+            raise ValueError('File %s is not an opening book!' % path)
+        self._length = length = size // ENTRY_SIZE
+        if length:
+            self._keys = np.memmap(path, KEY_TYPE, 'r', 0, (length,))
+            self._moves = np.memmap(path, MOVE_TYPE, 'r', length * KEY_TYPE.itemsize, (length,))
+            self._weights = np.memmap(path, WEIGHT_TYPE, 'r', length * (KEY_TYPE.itemsize + MOVE_TYPE.itemsize),
+                                      (length,))
+        else:
+            # Empty file can't be mapped
+            self._keys, self._moves, self._weights = (np.empty(0, dtype) for dtype in
+                                                      (KEY_TYPE, MOVE_TYPE, WEIGHT_TYPE))
+
+    def __len__(self):
+        return self._length
+
+    @classmethod
+    def for_game(cls, board_class: type, books_dir: str = BOOKS_DIR) -> Optional[OpeningBook]:
+        """Returns the book of the game from the books directory or None if the game has no book."""
+        path = book_path(board_class, books_dir)
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def get_moves(self, board: Board) -> list[tuple[Union[Move, tuple[Move, Move]], int]]:
+        """
+        Returns book moves of the position with their weights.
+
+        :param board: Current state of game.
+        :return: List of (move, weight), it's empty if the position is out of the book.
+        """
+        key = np.uint64(board.hash_key)
+        start = int(np.searchsorted(self._keys, key, 'left'))
+        end = int(np.searchsorted(self._keys, key, 'right'))
+        legal_moves = board.legal_moves
+        moves = []
+        for code, weight in zip(self._moves[start:end].tolist(), self._weights[start:end].tolist()):
+            move = board.decode_move(code)
+            # Different positions may have equal hashes
+            if move in legal_moves:
+                moves.append((move, weight))
+        return moves
+
+    def choose_move(self, board: Board, rng: Random = None) -> Union[Move, tuple[Move, Move], None]:
+        """
+        Chooses book move with probability proportional to its weight.
+
+        :param board: Current state of game.
+        :param rng: Random generator (it's seeded to reproduce the choice).
+        :return: Move or None if the position is out of the book.
+        """
+        moves = self.get_moves(board)
+        if not moves:
+            return None
+        if rng is None:
+            rng = Random()
+        return rng.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+
+def book_path(board_class: type, books_dir: str = BOOKS_DIR) -> str:
+    """Returns path of the book file of the game."""
+    return os.path.join(books_dir, board_class.__name__ + '.book')
+
+
+def build_book(boards: list[Board], path: str, plies: int = 6, max_depth: int = 4, count: int = 3,
+               tolerance: float = 0.05, **settings) -> int:
+    """
+    Builds the book by deep search of positions which are reached by book moves from the boards.
+    Moves with scores close to the best scores are stored, the better move has greater weight.
+
+    :param boards: The first positions of the book (initial positions of the game with different sizes).
+    :param path: File of the book.
+    :param plies: Number of moves from the first position, which are searched.
+    :param max_depth: Depth of the search of every position.
+    :param count: Max number of moves of the position in the book.
+    :param tolerance: Max difference of scores of the book moves with the best scores (in parts of MAX_SCORES).
+    :param settings: Other arguments of analyse (time budget, quiescence depth, etc.).
+    :return: Number of entries in the book.
+    """
+    # It's imported here because the search uses the book of this module
+    from games.ai.analysis import analyse
+
+    table = TranspositionTable(2 ** 20)
+    entries = {}
+    searched = set()
+    positions = [(board, 0) for board in boards]
+    while positions:
+        board, ply = positions.pop()
+        key = board.hash_key
+        if ply >= plies or board.is_win or board.is_draw or key in searched:
+            continue
+        searched.add(key)
+        analysis = analyse(board, max_depth, count, table, **settings)
+        if not analysis:
+            continue
+        best_scores = analysis[0].scores
+        for rank, (move, scores, _) in enumerate(analysis):
+            if scores < best_scores - tolerance * board.MAX_SCORES:
+                break
+            entries[key, board.encode_move(move)] = count - rank
+            positions.append((board.move(move), ply + 1))
+    rows = sorted((key, move, weight) for (key, move), weight in entries.items())
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'wb') as file:
+        for column, dtype in enumerate((KEY_TYPE, MOVE_TYPE, WEIGHT_TYPE)):
+            np.array([row[column] for row in rows], dtype=dtype).tofile(file)
+    return len(rows)
+
+
+if __name__ == '__main__':
+    from games.checkers import Checkers
+    from games.five_in_a_row import Five_in_a_row
+    from games.reversi import Reversi
+
+    # Settings of the search of the book positions for every game
+    games = {
+        'Checkers': (Checkers, {'plies': 8, 'max_depth': 8, 'quiescence_depth': 6}),
+        'Five_in_a_row': (Five_in_a_row, {'plies': 4, 'max_depth': 2}),
+        'Reversi': (Reversi, {'plies': 8, 'max_depth': 5}),
+    }
+    if len(sys.argv) < 3 or sys.argv[1] not in games:
+        print('Usage: python -m games.ai.opening_book {%s} <size> [<size> ...]' % ','.join(games))
+        sys.exit(1)
+    board_class, book_settings = games[sys.argv[1]]
+    first_boards = [board_class(size=int(size)) for size in sys.argv[2:]]
+    print('Book entries:', build_book(first_boards, book_path(board_class), **book_settings))
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Move ordering for the search: the better moves are searched first, the earlier cutoffs happen"""
+
+from games.abstracts import *
+
+
+class MoveOrdering:
+    """
+    Orders moves of the search node by:
+    1) the best move from the transposition table,
+    2) killer moves (moves which caused cutoffs at the same ply in other branches),
+    3) history heuristic (how often and how deep the move caused cutoffs),
+    4) static order of the game (Board.order_moves).
+    Moves are kept in the tables as integer codes (Board.encode_move).
+    """
+    KILLERS_PER_PLY = 2
+
+    def __init__(self):
+        self.killers = []
+        # History of every player: {move code: scores}
+        self.history = ({}, {}, {})
+
+    def get_killers(self, ply: int) -> list:
+        """Returns killer moves slots of the ply."""
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        return self.killers[ply]
+
+    def order(self, board: Board, moves: list, ply: int, best_move=None) -> list:
+        """
+        Returns moves in order of search.
+
+        :param board: Current state of game.
+        :param moves: Legal moves of the board.
+        :param ply: Distance from the root of the search.
+        :param best_move: Code of the best move from the transposition table.
+        :return: Ordered list of moves.
+        """
+        moves = board.order_moves(moves)
+        killers = self.get_killers(ply)
+        history = self.history[board.turn]
+        encode_move = board.encode_move
+
+        def priority(move):
+            code = encode_move(move)
+            if code == best_move:
+                return 2, 0
+            if code in killers:
+                return 1, 0
+            return 0, history.get(code, 0)
+
+        # Sorting is stable, so static order of the game is kept for moves with equal priority
+        return sorted(moves, key=priority, reverse=True)
+
+    def cutoff(self, board: Board, move, ply: int, depth: int):
+        """Remembers the move which caused a cutoff."""
+        code = board.encode_move(move)
+        killers = self.get_killers(ply)
+        if code not in killers:
+            killers.insert(0, code)
+            del killers[self.KILLERS_PER_PLY:]
+        history = self.history[board.turn]
+        history[code] = history.get(code, 0) + depth * depth
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel search in a pool of processes: split of the root moves between processes
+or Lazy SMP (all processes search the same root and share the transposition table).
+"""
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import Event, Value
+from random import Random, shuffle
+from time import perf_counter
+
+from games.abstracts import *
+from games.ai.decision_rule import alphabeta, search_deepening, search_root, search_root_negamax, \
+    Pruning, SearchContext, SearchTimeout, SearchCancelled
+from games.ai.evaluation_cache import EvaluationCache
+from games.ai.stats import SearchStats
+from games.ai.transposition import TranspositionTable, SharedTranspositionTable
+
+# Pools of processes are created once and reused by all searches:
+# {number of workers: (pool, shared alpha, stop event)}
+_pools = {}
+# How often (in seconds) the waiting search checks that it's cancelled
+CANCEL_CHECK_INTERVAL = 0.05
+
+# Globals of the worker process
+_worker_alpha = None
+_worker_stop = None
+_worker_table = None
+_worker_evaluation_cache = None
+# Shared table of the Lazy SMP search attached by the worker
+_worker_shared_table = None
+
+
+def _init_worker(shared_alpha, stop_event):
+    """
+    Initializes the worker process: keeps shared alpha and stop event and creates own transposition table
+    and evaluation cache.
+    """
+    global _worker_alpha, _worker_stop, _worker_table, _worker_evaluation_cache
+    _worker_alpha = shared_alpha
+    _worker_stop = stop_event
+    _worker_table = TranspositionTable()
+    _worker_evaluation_cache = EvaluationCache()
+
+
+def _worker_context(table: TranspositionTable, time_budget_ms: float, node_budget: int, quiescence_depth: int,
+                    evaluation_cache: bool, pruning: Pruning) -> SearchContext:
+    """Returns context of the search in the worker process."""
+    return SearchContext(table, time_budget_ms, node_budget, cancel_event=_worker_stop,
+                         quiescence_depth=quiescence_depth,
+                         evaluation_cache=_worker_evaluation_cache if evaluation_cache else None, pruning=pruning)
+
+
+def _finish_stats(context: SearchContext, probes: int, hits: int, evaluation_hits: int,
+                  evaluation_misses: int) -> SearchStats:
+    """Fills counters of the search in the worker process."""
+    stats = context.stats
+    stats.nodes = context.nodes
+    stats.table_probes = context.table.probes - probes
+    stats.table_hits = context.table.hits - hits
+    if context.evaluation_cache is not None:
+        stats.evaluation_hits = context.evaluation_cache.hits - evaluation_hits
+        stats.evaluation_misses = context.evaluation_cache.misses - evaluation_misses
+    return stats
+
+
+def _search_move(board_class: type, state: bytes, player: int, depth: int, age: int, time_budget_ms: float = None,
+                 node_budget: int = None, quiescence_depth: int = 0,
+                 evaluation_cache: bool = False, pruning: Pruning = None) -> tuple[Optional[float], int, SearchStats]:
+    """
+    Estimates one root move in the worker process.
+
+    :param board_class: Class of the board.
+    :param state: Binary state of game after the root move (Board.to_bytes).
+    :param player: Number of player, who did the root move.
+    :param depth: How deep to provide a search.
+    :param age: Age of the search (entries of the older searches are replaced first).
+    :param time_budget_ms: Remaining time of the search.
+    :param node_budget: Remaining nodes of the search.
+    :param quiescence_depth: Max number of forcing moves searched after the depth.
+    :param evaluation_cache: Use the evaluation cache of the worker.
+    :param pruning: Forward pruning of the search.
+    :return: Scores of the move (or None if the budget is exhausted), number of visited nodes
+             and statistics of the search.
+    """
+    board = board_class.from_bytes(state)
+    _worker_table.age = age
+    context = _worker_context(_worker_table, time_budget_ms, node_budget, quiescence_depth, evaluation_cache,
+                              pruning)
+    counters = (_worker_table.probes, _worker_table.hits,
+                _worker_evaluation_cache.hits, _worker_evaluation_cache.misses)
+    # The best scores of already searched moves (found by any worker) give cutoffs for this move
+    alpha = _worker_alpha.value
+    try:
+        scores = alphabeta(board, player, depth, alpha=alpha, context=context)
+    except SearchTimeout:
+        scores = None
+    stats = _finish_stats(context, *counters)
+    if scores is None:
+        return None, context.nodes, stats
+    with _worker_alpha.get_lock():
+        if scores > _worker_alpha.value:
+            _worker_alpha.value = scores
+    return scores, context.nodes, stats
+
+
+def get_pool(workers: int) -> tuple[ProcessPoolExecutor, Value, Event]:
+    """Returns pool of processes, shared alpha and event to stop searches of workers for the number of workers."""
+    if workers not in _pools:
+        shared_alpha = Value('d', float('-inf'))
+        stop_event = Event()
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(shared_alpha, stop_event))
+        _pools[workers] = (pool, shared_alpha, stop_event)
+    return _pools[workers]
+
+
+def search_root_parallel(board: Board, moves: list, depth: int, context: SearchContext,
+                         workers: int) -> tuple[Union[Move, tuple[Move, Move]], dict]:
+    """
+    Estimates every move of the current player using a pool of processes (young brothers wait):
+    the first move is searched in the current process to get alpha, the other moves are searched in parallel.
+    Only one parallel search can be run at the same time.
+
+    :param board: Current state of game
+    :param moves: Moves of the player in order of search.
+    :param depth: How deep to provide a search
+    :param context: Transposition table, limits and counters of the search.
+    :param workers: Number of processes.
+    :return: Move with maximum estimated scores and dictionary with scores of searched moves.
+    """
+    player = board.turn
+    pool, shared_alpha, stop_event = get_pool(workers)
+    stop_event.clear()
+    first_scores = alphabeta(board.move(moves[0]), player, depth, context=context)
+    shared_alpha.value = first_scores
+    root_scores = {moves[0]: first_scores}
+    futures = {}
+    for move in moves[1:]:
+        time_budget_ms = (context.deadline - perf_counter()) * 1000 if context.deadline else None
+        node_budget = context.node_budget - context.nodes if context.node_budget else None
+        # Boards are sent to the workers in the compact binary form
+        future = pool.submit(_search_move, type(board), board.move(move).to_bytes(), player, depth, context.table.age,
+                             time_budget_ms, node_budget, context.quiescence_depth,
+                             context.evaluation_cache is not None, context.pruning)
+        futures[future] = move
+    try:
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=CANCEL_CHECK_INTERVAL, return_when=FIRST_COMPLETED)
+            if context.is_cancelled:
+                raise SearchCancelled()
+            for future in done:
+                scores, nodes, stats = future.result()
+                context.nodes += nodes
+                context.stats.merge(stats)
+                if scores is None:
+                    raise SearchTimeout()
+                root_scores[futures[future]] = scores
+    except SearchTimeout:
+        # Searches of the workers are stopped, so the pool is free for the next search
+        stop_event.set()
+        for future in futures:
+            future.cancel()
+        raise
+    # The first of the moves with equal scores is chosen like in the serial search
+    best_move = max(moves, key=root_scores.get)
+    return best_move, root_scores
+
+
+def _attach_table(name: str, size: int) -> SharedTranspositionTable:
+    """Returns shared table of the Lazy SMP search in the worker process."""
+    global _worker_shared_table
+    if _worker_shared_table is None or _worker_shared_table.name != name:
+        if _worker_shared_table is not None:
+            _worker_shared_table.close()
+        _worker_shared_table = SharedTranspositionTable(size, name)
+    return _worker_shared_table
+
+
+def _search_helper(board_class: type, state: bytes, helper: int, max_depth: int, table_name: str, table_size: int,
+                   age: int,
+                   time_budget_ms: float = None, node_budget: int = None, quiescence_depth: int = 0,
+                   algorithm: str = 'alphabeta', evaluation_cache: bool = False,
+                   pruning: Pruning = None) -> tuple[int, SearchStats]:
+    """
+    Searches the root in the worker process until the main search is finished.
+    Helpers search in other order of moves and odd helpers are one iteration ahead,
+    so they fill the shared table with results which the main search will need.
+
+    :param board_class: Class of the board.
+    :param state: Binary state of game (Board.to_bytes).
+    :param helper: Number of the helper.
+    :param max_depth: Max depth of the main search.
+    :param table_name: Name of the shared memory of the table.
+    :param table_size: Number of slots in the table.
+    :param age: Age of the search.
+    :param time_budget_ms: Remaining time of the search.
+    :param node_budget: Remaining nodes of the search.
+    :param quiescence_depth: Max number of forcing moves searched after the depth.
+    :param algorithm: 'alphabeta' or 'negamax'.
+    :param evaluation_cache: Use the evaluation cache of the worker.
+    :param pruning: Forward pruning of the search.
+    :return: Number of visited nodes and statistics of the search.
+    """
+    board = board_class.from_bytes(state)
+    table = _attach_table(table_name, table_size)
+    table.age = age
+    context = _worker_context(table, time_budget_ms, node_budget, quiescence_depth, evaluation_cache, pruning)
+    counters = table.probes, table.hits, _worker_evaluation_cache.hits, _worker_evaluation_cache.misses
+    search = search_root_negamax if algorithm == 'negamax' else search_root
+    moves = list(board.legal_moves)
+    shuffle(moves)
+    try:
+        for depth in range(helper % 2, max_depth + 1 + helper % 2):
+            _, root_scores = search(board, moves, depth, context)
+            moves.sort(key=lambda move: root_scores[move], reverse=True)
+    except SearchTimeout:
+        pass
+    return context.nodes, _finish_stats(context, *counters)
+
+
+def search_lazy_smp(board: Board, max_depth: int, context: SearchContext, workers: int,
+                    algorithm: str = 'alphabeta', temperature: float = 0,
+                    rng: Random = None) -> Union[Move, tuple[Move, Move]]:
+    """
+    Lazy SMP: the main search and helpers in other processes search the same root and share
+    the transposition table, so the main search finds results of the helpers in the table.
+    Helpers are stopped when the main search is finished. Only one parallel search can be run at the same time.
+
+    :param board: Current state of game
+    :param max_depth: How deep to provide a search
+    :param context: Transposition table, limits and counters of the search. If the table isn't shared,
+                    the shared table of the same size is created for this search.
+    :param workers: Number of processes (including the current one).
+    :param algorithm: 'alphabeta' or 'negamax'.
+    :param temperature: Temperature of the move sampling in parts of board's MAX_SCORES.
+    :param rng: Random generator.
+    :return: Move with maximum estimated scores
+    """
+    table = context.table
+    own_table = not isinstance(table, SharedTranspositionTable)
+    if own_table:
+        context.table = SharedTranspositionTable(table.size)
+        context.table.age = table.age
+    pool, _, stop_event = get_pool(workers - 1)
+    stop_event.clear()
+    time_budget_ms = (context.deadline - perf_counter()) * 1000 if context.deadline else None
+    state = board.to_bytes()
+    futures = [pool.submit(_search_helper, type(board), state, helper, max_depth, context.table.name, context.table.size,
+                           context.table.age, time_budget_ms, context.node_budget, context.quiescence_depth,
+                           algorithm, context.evaluation_cache is not None, context.pruning)
+               for helper in range(1, workers)]
+    try:
+        return search_deepening(board, max_depth, context, 1, algorithm, temperature, rng)
+    finally:
+        stop_event.set()
+        for future in futures:
+            nodes, stats = future.result()
+            context.nodes += nodes
+            context.stats.merge(stats)
+        if own_table:
+            context.stats.table_probes += context.table.probes
+            context.stats.table_hits += context.table.hits
+            context.table.close()
+            context.table = table
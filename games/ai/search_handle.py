@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Search of the best move which can be run in background and cancelled from other thread"""
+
+from __future__ import annotations
+from threading import Event, Thread
+
+from games.abstracts import *
+from games.ai.decision_rule import find_best_move
+from games.ai.stats import SearchStats
+
+
+class SearchHandle:
+    """
+    Handle of one search of the best move. The search checks the cancel event together with its budget
+    (every SearchContext.CHECK_EVERY nodes), so cancellation stops it soon without killing the thread.
+    The best move of the completed iterations is always available.
+    """
+
+    def __init__(self, board: Board, **settings):
+        """
+        :param board: Current state of game.
+        :param settings: Arguments of find_best_move (difficulty settings, transposition table, etc.).
+        """
+        self.board = board
+        self.settings = settings
+        self.stats = SearchStats()
+        self._cancel_event = Event()
+        self._done_event = Event()
+        self._thread = None
+        self._move = None
+        self._error = None
+
+    def run(self) -> Union[Move, tuple[Move, Move]]:
+        """Searches in the current thread and returns the best move."""
+        try:
+            self._move = find_best_move(self.board, stats=self.stats, cancel_event=self._cancel_event,
+                                        **self.settings)
+        except Exception as error:
+            self._error = error
+            raise
+        finally:
+            self._done_event.set()
+        return self._move
+
+    def _run_in_background(self):
+        try:
+            self.run()
+        except Exception:
+            # The error is raised again by result()
+            pass
+
+    def start(self) -> SearchHandle:
+        """Starts the search in the background thread."""
+        self._thread = Thread(target=self._run_in_background, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Asks the search to stop. The search returns the best move of the completed iterations."""
+        self._cancel_event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def is_done(self) -> bool:
+        """Returns True if the search is finished (or cancelled and stopped)."""
+        return self._done_event.is_set()
+
+    @property
+    def best_move(self) -> Union[Move, tuple[Move, Move], None]:
+        """Returns the found move if the search is finished, else the best move of the completed iterations."""
+        if self.is_done and self._move is not None:
+            return self._move
+        return self.stats.best_move
+
+    def wait(self, timeout: float = None) -> bool:
+        """Waits for the end of the search and returns True if it's finished."""
+        return self._done_event.wait(timeout)
+
+    def result(self, timeout: float = None) -> Union[Move, tuple[Move, Move], None]:
+        """
+        Waits for the end of the search and returns the best move.
+
+        :param timeout: Seconds to wait (the best move so far is returned if the search isn't finished).
+        :return: Best move.
+        """
+        self.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self.best_move
+
+    def stop(self) -> Union[Move, tuple[Move, Move], None]:
+        """Cancels the search, waits for its end and returns the best move found so far."""
+        self.cancel()
+        return self.result()
+
+
+def ponder(board: Board, player: int, **settings) -> Optional[SearchHandle]:
+    """
+    Starts the background search of the player on the opponent's time. The search is started from
+    the position after the predicted moves of the opponent, so its results in the transposition table
+    (or in the Monte Carlo tree) are stored from the player's point of view and are reused by the next
+    search of the player.
+
+    :param board: Current state of game (the opponent's turn).
+    :param player: Number of player, who ponders.
+    :param settings: Arguments of find_best_move (the table or the tree must be given to keep the results).
+    :return: Handle of the started search or None if the game is finished before the player's turn.
+    """
+    while board.turn != player:
+        if board.is_win or board.is_draw:
+            return None
+        # The opponent's move is predicted by the fast search
+        board = board.move(find_best_move(board))
+    if board.is_win or board.is_draw:
+        return None
+    return SearchHandle(board, **settings).start()
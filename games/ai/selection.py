@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Selection of the move by the scores of the search (easier difficulty levels don't play the best move)"""
+
+from math import exp, inf
+from random import Random
+
+from games.abstracts import *
+
+
+def softmax_select(root_scores: dict, temperature: float, rng: Random) -> Union[Move, tuple[Move, Move]]:
+    """
+    Samples move with probability proportional to exp(scores / temperature).
+    The higher temperature, the more often the worse moves are chosen, zero temperature gives the best move.
+
+    :param root_scores: Dictionary with exact scores of the moves (moves with scores -inf are never chosen).
+    :param temperature: Temperature in units of scores.
+    :param rng: Random generator (it's seeded to reproduce the choice).
+    :return: Chosen move.
+    """
+    moves = list(root_scores)
+    best_scores = max(root_scores.values())
+    if temperature <= 0 or abs(best_scores) == inf:
+        return max(moves, key=root_scores.get)
+    weights = [exp((root_scores[move] - best_scores) / temperature) for move in moves]
+    return rng.choices(moves, weights)[0]
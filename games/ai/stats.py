@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Statistics of the search for watching performance of the AI"""
+
+from __future__ import annotations
+import json
+from math import isfinite
+from typing import Optional, TextIO
+
+
+def _json_scores(scores: float = None) -> Optional[float]:
+    """Returns scores for json: infinite scores (won games, unsearched bounds) are written as null."""
+    return scores if scores is None or isfinite(scores) else None
+
+
+class SearchStats:
+    """
+    Counters of one search (one move of the computer).
+    Nodes and cutoffs are counted by the search, iterations are added by iterative deepening.
+    """
+
+    def __init__(self, game: str = None, algorithm: str = None):
+        """
+        :param game: Name of the game (class of the board).
+        :param algorithm: Name of the search algorithm.
+        """
+        self.game = game
+        self.algorithm = algorithm
+        self.nodes = 0
+        # Number of evaluated positions (leaves of the search tree)
+        self.leaves = 0
+        # Number of cutoffs at each distance from the root: {ply: cutoffs}
+        self.cutoffs = {}
+        self.table_probes = 0
+        self.table_hits = 0
+        # Evaluations found in the evaluation cache and evaluations computed by the board
+        self.evaluation_hits = 0
+        self.evaluation_misses = 0
+        # Completed iterations of the deepening: dictionaries with depth, nodes, elapsed time and scores
+        self.iterations = []
+        self.elapsed = 0.0
+        self.best_move = None
+        # Move of the opening book (the search isn't run)
+        self.book_move = None
+        # Exact result of the best move found by the endgame solver (None if the game wasn't solved)
+        self.endgame_scores = None
+
+    def cutoff(self, ply: int):
+        """Counts cutoff at the ply."""
+        self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+
+    def add_iteration(self, depth: int, nodes: int, elapsed: float, scores: float = None):
+        """
+        Remembers completed iteration of the deepening.
+
+        :param depth: Depth of the iteration.
+        :param nodes: Number of nodes visited by the iteration.
+        :param elapsed: Seconds since the start of the search.
+        :param scores: Scores of the best move.
+        """
+        self.iterations.append({'depth': depth, 'nodes': nodes, 'elapsed': elapsed, 'scores': scores})
+
+    def merge(self, other: SearchStats):
+        """
+        Adds counters of the other search (for example, searched by another process).
+        Nodes aren't added, they are counted by the context of the search together with its budget.
+        """
+        self.leaves += other.leaves
+        for ply, cutoffs in other.cutoffs.items():
+            self.cutoffs[ply] = self.cutoffs.get(ply, 0) + cutoffs
+        self.table_probes += other.table_probes
+        self.table_hits += other.table_hits
+        self.evaluation_hits += other.evaluation_hits
+        self.evaluation_misses += other.evaluation_misses
+
+    @property
+    def depth(self) -> int:
+        """Returns depth of the last completed iteration."""
+        return self.iterations[-1]['depth'] if self.iterations else 0
+
+    @property
+    def table_hit_rate(self) -> float:
+        """Returns part of transposition table probes which found the position."""
+        return self.table_hits / self.table_probes if self.table_probes else 0.0
+
+    @property
+    def evaluation_hit_rate(self) -> float:
+        """Returns part of evaluations which were found in the evaluation cache."""
+        probes = self.evaluation_hits + self.evaluation_misses
+        return self.evaluation_hits / probes if probes else 0.0
+
+    @property
+    def effective_branching_factor(self) -> float:
+        """
+        Returns ratio of nodes of the last two iterations
+        (or root of the nodes number if there is only one iteration).
+        """
+        nodes = [iteration['nodes'] for iteration in self.iterations if iteration['nodes']]
+        if len(nodes) >= 2:
+            return nodes[-1] / nodes[-2]
+        if self.depth:
+            return self.nodes ** (1 / self.depth)
+        return float(self.nodes)
+
+    def to_dict(self) -> dict:
+        """Returns statistics as dictionary of json types."""
+        return {
+            'game': self.game,
+            'algorithm': self.algorithm,
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'cutoffs': {str(ply): cutoffs for ply, cutoffs in sorted(self.cutoffs.items())},
+            'table_hit_rate': self.table_hit_rate,
+            'evaluation_hit_rate': self.evaluation_hit_rate,
+            'effective_branching_factor': self.effective_branching_factor,
+            'depth': self.depth,
+            'iterations': [{**iteration, 'scores': _json_scores(iteration['scores'])} for iteration in self.iterations],
+            'elapsed': self.elapsed,
+            'best_move': self.best_move,
+            'book_move': self.book_move,
+            'endgame_scores': _json_scores(self.endgame_scores),
+        }
+
+    def to_json(self, **extra) -> str:
+        """
+        Returns statistics as one line of json.
+
+        :param extra: Additional fields (for example, difficulty).
+        """
+        return json.dumps({**self.to_dict(), **extra}, allow_nan=False)
+
+    def write(self, file: TextIO, **extra):
+        """Appends statistics to the file of json lines."""
+        file.write(self.to_json(**extra) + '\n')
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Transposition table for storing results of already searched positions"""
+
+import struct
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    """
+    Bounded table of search results keyed by Zobrist hash of a position.
+    Every entry is a tuple (key, depth, scores, bound type, code of the best move, age).
+    Entry is replaced by a new one if it is from an older search or its depth is not greater.
+    """
+
+    def __init__(self, size: int = 2 ** 16):
+        """
+        :param size: Number of slots in the table.
+        """
+        self._size = size
+        self._slots = [None] * size
+        self.age = 0
+        self.hits = 0
+        self.probes = 0
+
+    @property
+    def size(self) -> int:
+        """Returns number of slots in the table."""
+        return self._size
+
+    def __len__(self):
+        return self._size - self._slots.count(None)
+
+    def new_search(self):
+        """Marks all stored entries as old (entries of the previous search are replaced first)."""
+        self.age += 1
+
+    def clear(self):
+        self._slots = [None] * self._size
+        self.age = 0
+
+    def get(self, key: int) -> Optional[tuple]:
+        """Returns entry (key, depth, scores, bound, best move code, age) for the position or None."""
+        self.probes += 1
+        entry = self._slots[key % self._size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, scores: float, bound: int, best_move: int = None):
+        """
+        Stores the result of the search.
+
+        :param key: Hash of the position.
+        :param depth: Remaining depth of the search for the position.
+        :param scores: Estimation of the position.
+        :param bound: EXACT, LOWER (scores is lower bound) or UPPER (scores is upper bound).
+        :param best_move: Code of the best move (or move which caused a cutoff) in the position (Board.encode_move).
+        """
+        index = key % self._size
+        entry = self._slots[index]
+        if entry is None or entry[0] == key or entry[5] != self.age or depth >= entry[1]:
+            if best_move is None and entry is not None and entry[0] == key:
+                # Keep the known best move of this position
+                best_move = entry[4]
+            self._slots[index] = (key, depth, scores, bound, best_move, self.age)
+
+    def lookup(self, key: int, depth: int, alpha: float, beta: float) -> tuple[Optional[float], Optional[int]]:
+        """
+        Probes the table for the position.
+
+        :return: scores (if the entry is deep enough and its bound gives a cutoff, else None) and code
+                 of the stored best move.
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None, None
+        _, entry_depth, scores, bound, best_move, _ = entry
+        if entry_depth >= depth:
+            if bound == EXACT or (bound == LOWER and scores >= beta) or (bound == UPPER and scores <= alpha):
+                return scores, best_move
+        return None, best_move
+
+
+# Entry of the shared table: check is xor of the key with other fields, scores are bits of float64
+SHARED_ENTRY = np.dtype([('check', np.uint64), ('scores', np.uint64), ('info', np.uint64)])
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    Transposition table in shared memory, which is used by several processes at the same time (Lazy SMP).
+    Entries are packed into NumPy structured array and written without locks: check field is xor of the key
+    with the other fields, so an entry torn by simultaneous writes doesn't match the key and is ignored.
+    """
+    # Bits of the info field: used flag (1), depth (8), bound (2), age (8), move code + 1 (45, 0 for no move)
+    DEPTH_SHIFT, BOUND_SHIFT, AGE_SHIFT, MOVE_SHIFT = 1, 9, 11, 19
+
+    def __init__(self, size: int = 2 ** 16, name: str = None):
+        """
+        :param size: Number of slots in the table.
+        :param name: Name of the shared memory of the existing table (new memory is created if it's None).
+        """
+        self._size = size
+        self._memory = shared_memory.SharedMemory(name, create=name is None, size=size * SHARED_ENTRY.itemsize)
+        # Only the process, which created the memory, frees it
+        self._is_owner = name is None
+        self._entries = np.ndarray((size,), dtype=SHARED_ENTRY, buffer=self._memory.buf)
+        if self._is_owner:
+            self._entries[:] = 0
+        self.age = 0
+        self.hits = 0
+        self.probes = 0
+
+    @property
+    def name(self) -> str:
+        """Returns name of the shared memory for other processes."""
+        return self._memory.name
+
+    def __len__(self):
+        return int(np.count_nonzero(self._entries['info']))
+
+    def clear(self):
+        self._entries[:] = 0
+        self.age = 0
+
+    def close(self):
+        """Detaches the table from the shared memory (and frees the memory if the table created it)."""
+        if getattr(self, '_memory', None) is None:
+            return
+        self._entries = None
+        self._memory.close()
+        if self._is_owner:
+            self._memory.unlink()
+        self._memory = None
+
+    def __del__(self):
+        self.close()
+
+    def _read(self, key: int) -> Optional[tuple]:
+        check, bits, info = self._entries[key % self._size].item()
+        if not info or check ^ bits ^ info != key:
+            return None
+        scores = struct.unpack('<d', struct.pack('<Q', bits))[0]
+        move = info >> self.MOVE_SHIFT
+        return (key, (info >> self.DEPTH_SHIFT) & 255, scores, (info >> self.BOUND_SHIFT) & 3,
+                move - 1 if move else None, (info >> self.AGE_SHIFT) & 255)
+
+    def get(self, key: int) -> Optional[tuple]:
+        """Returns entry (key, depth, scores, bound, best move code, age) for the position or None."""
+        self.probes += 1
+        entry = self._read(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def store(self, key: int, depth: int, scores: float, bound: int, best_move: int = None):
+        """
+        Stores the result of the search.
+
+        :param key: Hash of the position.
+        :param depth: Remaining depth of the search for the position.
+        :param scores: Estimation of the position.
+        :param bound: EXACT, LOWER (scores is lower bound) or UPPER (scores is upper bound).
+        :param best_move: Code of the best move (or move which caused a cutoff) in the position.
+        """
+        index = key % self._size
+        age = self.age & 255
+        _, _, info = self._entries[index].item()
+        if info:
+            entry = self._read(key)
+            if entry is None and (info >> self.AGE_SHIFT) & 255 == age and depth < (info >> self.DEPTH_SHIFT) & 255:
+                # The slot keeps deeper result of another position of the current search
+                return
+            if best_move is None and entry is not None:
+                best_move = entry[4]
+        bits = struct.unpack('<Q', struct.pack('<d', scores))[0]
+        info = (1 | depth << self.DEPTH_SHIFT | bound << self.BOUND_SHIFT | age << self.AGE_SHIFT |
+                (best_move + 1 if best_move is not None else 0) << self.MOVE_SHIFT)
+        self._entries[index] = (key ^ bits ^ info, bits, info)
@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 
-from copy import deepcopy
-
 import numpy as np
 
-from games.abstracts import Piece, Board, Move
+from games.abstracts import Piece, Board, Move, Zobrist, Geometry, cached_state, encode_location, \
+    decode_location
 
 
 class Checkers_piece(Piece):
+    __slots__ = ('is_king', 'location')
+
     def __init__(self, player: int, location: Move = None, is_king: bool = False):
         super().__init__(player)
         self.is_king = is_king
@@ -23,9 +24,19 @@ class Checkers_piece(Piece):
 
 
 class Checkers(Board):
+    SUPPORTS_PUSH = True
+    PAIR_MOVES = True
+    # Flag of king in the cell code
+    KING = 4
+    FLAG_BITS = 1
+    # Location of the piece which must continue taking and number of moves without taking
+    STATE_FORMAT = 'HH'
+    # Indices of the diagonal rays of Geometry: all directions of kings and forward directions of the players
+    KING_RAYS = (4, 6, 7, 5)
+    FORWARD_RAYS = (None, (5, 7), (4, 6))
 
     def __init__(self, size: int = 8, turn: int = 1, field: np.ndarray = None,
-                 pieces_lists: list[list[Checkers_piece]] = None, last_taker: Checkers_piece = None,
+                 pieces_lists: list[list[Move]] = None, last_taker: Move = None,
                  turns_without_attack: int = 0):
         """
 
@@ -34,31 +45,40 @@ class Checkers(Board):
         :param size: Board size. If new board is empty
         :param turn: 1 or 2 for player number.
         :param field: Old field with new move. If a new board is obtained by making a move on the previous board.
-        :param pieces_lists: List of lists of players pieces.
-        :param last_taker: The piece that took the opponent's piece on the last move (Or None, if there was no take).
+        :param pieces_lists: List of lists of players pieces locations.
+        :param last_taker: Location of the piece that took the opponent's piece on the last move
+            (Or None, if there was no take).
         :param turns_without_attack: Number of moves in a row without taking pieces.
         """
         self._size = size
         if field is None:
-            field = np.array([[Checkers_piece(0) for _ in range(self._size)] for _ in range(self._size)], dtype=object)
+            field = np.zeros((self._size, self._size), dtype=np.int8)
             # Lists of pieces
             reds, blues = [], []
             for i in range(self._size // 2 - 1):
                 for j in range(self._size):
                     if (i + j) % 2:
-                        red = Checkers_piece(1, (self._size - 1 - i, self._size - 1 - j))
-                        field[self._size - 1 - i][self._size - 1 - j] = red
+                        red = (self._size - 1 - i, self._size - 1 - j)
+                        field[red] = 1
                         reds.append(red)
-                        blue = Checkers_piece(2, (i, j))
-                        field[i][j] = blue
+                        blue = (i, j)
+                        field[blue] = 2
                         blues.append(blue)
                         pieces_lists = [reds, blues]
         self._pieces_lists = pieces_lists
         self._field = field
         self._turn = turn
         self.turns_without_attack = turns_without_attack
+        self.update_legal_moves(last_taker)
+
+    def to_piece(self, code: int) -> Piece:
+        return Checkers_piece(code & self.PLAYER_MASK, is_king=bool(code & self.KING))
+
+    def update_legal_moves(self, last_taker: Move = None):
         # There is possible attack move
         self.can_attack = True
+        # Location of the piece which must continue taking
+        self.chain_location = None
         # If last piece took an opponent piece
         if last_taker:
             # Back to last player
@@ -67,89 +87,131 @@ class Checkers(Board):
             # If can continue taking pieces
             if len(moves) != 0:
                 self._legal_moves = moves
+                self._legal_set = set(moves)
+                self.chain_location = last_taker
                 return
             # If no possible moves then other player move
             self._turn = self.last_turn
         # If can't continue attack then other player search for the attack move
         # Taking is mandatory
-        moves = self.get_moves(self._pieces_lists[turn - 1])
+        moves = self.get_moves(self._pieces_lists[self._turn - 1])
         # But if there is no attack move then search for the simple move
         if len(moves) == 0:
-            moves = self.get_moves(self._pieces_lists[turn - 1], False)
+            moves = self.get_moves(self._pieces_lists[self._turn - 1], False)
             self.can_attack = False
         self._legal_moves = moves
+        # Moves are checked by push against the set, so the list isn't scanned
+        self._legal_set = set(moves)
 
-    def get_moves(self, pieces: list[Checkers_piece], is_attack: bool = True) -> list[tuple[Move, Move]]:
+    def get_moves(self, pieces: list[Move], is_attack: bool = True) -> list[tuple[Move, Move]]:
         """Returns a list of possible moves (attack or simple)."""
         moves = []
-        for piece in pieces:
-            x, y = piece.location
-            player = self.turn
-            opponent = self.last_turn
-            if piece.is_king:
-                directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+        player = self.turn
+        opponent = self.last_turn
+        rays = Geometry.get(self._size).rays
+        for x, y in pieces:
+            if self._field[x, y] & self.KING:
+                directions = self.KING_RAYS
             else:
-                if player == 1:
-                    directions = [(-1, -1), (-1, 1)]
-                else:
-                    directions = [(1, 1), (1, -1)]
-            for dx, dy in directions:
+                directions = self.FORWARD_RAYS[player]
+            for direction in directions:
+                ray = rays[x][y][direction]
                 if is_attack:
-                    if 0 <= x+dx*2 < self._size and 0 <= y+dy*2 < self._size and \
-                            self._field[x+dx][y+dy] == opponent and self._field[x+dx*2][y+dy*2] == 0:
-                        moves.append(((x, y), (x+dx*2, y+dy*2)))
+                    if len(ray) > 1 and self._field[ray[0]] & self.PLAYER_MASK == opponent and \
+                            self._field[ray[1]] == 0:
+                        moves.append(((x, y), ray[1]))
                 else:
-                    if 0 <= x+dx < self._size and 0 <= y+dy < self._size and \
-                            self._field[x+dx][y+dy] == 0:
-                        moves.append(((x, y), (x+dx, y+dy)))
+                    if ray and self._field[ray[0]] == 0:
+                        moves.append(((x, y), ray[0]))
         return moves
 
+    def _get_state(self) -> tuple:
+        return encode_location(self.chain_location, self._size), self.turns_without_attack
+
+    @classmethod
+    def _from_state(cls, size: int, turn: int, field: np.ndarray, state: tuple) -> Board:
+        pieces_lists = [[(x, y) for x, y in np.argwhere(field & cls.PLAYER_MASK == player).tolist()]
+                        for player in (1, 2)]
+        chain_location = decode_location(state[0], size)
+        if chain_location is not None:
+            # The piece continues taking after the move of the opponent is passed back to it
+            turn = Piece.opposite(turn)
+        return cls(size, turn, field, pieces_lists, chain_location, state[1])
+
+    def copy(self) -> Board:
+        board = super().copy()
+        board._pieces_lists = [self._pieces_lists[0].copy(), self._pieces_lists[1].copy()]
+        return board
+
     def move(self, locations: tuple[Move, Move]) -> Board:
+        board = self.copy()
+        board._apply(locations)
+        return board
+
+    def _apply(self, locations: tuple[Move, Move]):
+        if locations not in self._legal_set:
+            raise IndexError('Bad move %s!' % str(locations))
         last_pos, new_pos = locations
-        new_field = deepcopy(self._field)
+        code = self._field[last_pos]
         # Turning into a king
         if (self.turn == 1 and new_pos[0] == 0) or (self.turn == 2 and new_pos[0] == self._size - 1):
-            new_field[last_pos].is_king = True
-            is_king = True
+            new_code = code | self.KING
         else:
-            is_king = False
-        if locations not in self._legal_moves:
-            raise IndexError('Bad move %s!' % str(locations))
-        new_field[last_pos], new_field[new_pos] = new_field[new_pos], new_field[last_pos]
-        new_field[new_pos].location = new_pos
-        # Change piece location
-        new_pieces_lists = deepcopy(self._pieces_lists)
-        for piece in new_pieces_lists[self.turn - 1]:
-            if piece.location == last_pos:
-                piece.location = new_pos
-                # Change simple piece to king in list
-                if is_king:
-                    piece.is_king = True
-                break
-        new_turn = self.last_turn
-        last_taker = None
-        turns_without_attack = self.turns_without_attack + 1
+            new_code = code
+        pieces = self._pieces_lists[self.turn - 1]
+        index = pieces.index(last_pos)
+        taken_index, taken_code = None, None
         if self.can_attack:
-            turns_without_attack = 0
-            # Remove opponent piece
+            # Opponent piece to remove
             x, y = last_pos
             new_x, new_y = new_pos
-            med_x, med_y = x + (new_x - x) // 2, y + (new_y - y) // 2
-            for i in range(len(new_pieces_lists[self.last_turn - 1])):
-                if new_pieces_lists[self.last_turn - 1][i].location == (med_x, med_y):
-                    new_pieces_lists[self.last_turn - 1].pop(i)
-                    new_field[med_x][med_y] = Checkers_piece(0)
-                    break
-            last_taker = new_field[new_pos]
-        return Checkers(self._size, new_turn, new_field, new_pieces_lists, last_taker, turns_without_attack)
+            med = x + (new_x - x) // 2, y + (new_y - y) // 2
+            opponent_pieces = self._pieces_lists[self.last_turn - 1]
+            taken_index = opponent_pieces.index(med)
+            taken_code = self._field[med]
+        record = (self._turn, self._field_hash, self._legal_moves, self._legal_set, self.can_attack,
+                  self.chain_location, self.turns_without_attack, locations, code, index, taken_index, taken_code)
+        # Change piece location
+        self._set_cell(last_pos, 0)
+        self._set_cell(new_pos, new_code)
+        pieces[index] = new_pos
+        last_taker = None
+        if self.can_attack:
+            self.turns_without_attack = 0
+            opponent_pieces.pop(taken_index)
+            self._set_cell(med, 0)
+            last_taker = new_pos
+        else:
+            self.turns_without_attack += 1
+        self._turn = self.last_turn
+        self.update_legal_moves(last_taker)
+        return record
 
-    @property
+    def _revert(self, record):
+        (self._turn, self._field_hash, self._legal_moves, self._legal_set, self.can_attack, self.chain_location,
+         self.turns_without_attack, (last_pos, new_pos), code, index, taken_index, taken_code) = record
+        self._pieces_lists[self._turn - 1][index] = last_pos
+        self._field[new_pos] = 0
+        self._field[last_pos] = code
+        if taken_index is not None:
+            med = (last_pos[0] + new_pos[0]) // 2, (last_pos[1] + new_pos[1]) // 2
+            self._pieces_lists[Piece.opposite(self._turn) - 1].insert(taken_index, med)
+            self._field[med] = taken_code
+
+    def _extra_hash(self, zobrist: Zobrist) -> int:
+        extra_hash = zobrist.extras[min(self.turns_without_attack, Zobrist.EXTRAS - 1)]
+        if self.chain_location:
+            x, y = self.chain_location
+            extra_hash ^= zobrist.cells[x][y][0]
+        return extra_hash
+
+    @cached_state
     def is_win(self) -> bool:
         if len(self._legal_moves) == 0 or (len(self._pieces_lists[self.turn - 1]) <= 1):
             return True
         return False
 
-    @property
+    @cached_state
     def is_draw(self) -> bool:
         lens = (len(self._pieces_lists[0]), len(self._pieces_lists[1]))
         if min(lens) == 1 and max(lens) <= 3 and not self.can_attack:
@@ -162,6 +224,26 @@ class Checkers(Board):
             return True
         return False
 
+    def is_forcing(self, move: tuple[Move, Move]) -> bool:
+        # Attacks are mandatory, so all moves are attacks if one of them is
+        return self.can_attack
+
+    def order_moves(self, moves: list[tuple[Move, Move]]) -> list[tuple[Move, Move]]:
+        # Taking is mandatory, so all moves are attacks or all are simple moves.
+        # Attacks on kings and turning into a king are searched first.
+        last_row = 0 if self.turn == 1 else self._size - 1
+
+        def priority(move):
+            (x, y), (new_x, new_y) = move
+            scores = 0
+            if new_x == last_row and not self._field[x, y] & self.KING:
+                scores += 2
+            if self.can_attack:
+                scores += 3 if self._field[(x + new_x) // 2, (y + new_y) // 2] & self.KING else 1
+            return scores
+
+        return sorted(moves, key=priority, reverse=True)
+
     @property
     def legal_moves(self) -> list[tuple[Move, Move]]:
         return self._legal_moves
@@ -173,8 +255,10 @@ class Checkers(Board):
             return -100
         elif self.is_draw:
             return 0
-        player_scores = sum((3 if piece.is_king else 1 for piece in self._pieces_lists[player - 1]))
-        enemy_scores = sum((3 if piece.is_king else 1 for piece in self._pieces_lists[Piece.opposite(player) - 1]))
+        opponent = Piece.opposite(player)
+        # King costs 3 pieces
+        player_scores = len(self._pieces_lists[player - 1]) + 2 * int((self._field == (player | self.KING)).sum())
+        enemy_scores = len(self._pieces_lists[opponent - 1]) + 2 * int((self._field == (opponent | self.KING)).sum())
         scores = player_scores - enemy_scores
         if self.can_attack and self.turn == player:
             scores *= 1.1
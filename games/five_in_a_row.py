@@ -1,11 +1,10 @@
 # -*- coding: utf-8 -*-
 
-from copy import deepcopy
-from random import randint
 
 import numpy as np
 
-from games.abstracts import Piece, Board, Move
+from games.abstracts import Piece, Board, Move, Zobrist, Geometry, cached_state, encode_location, \
+    decode_location, empty_cells_near
 
 
 class Five_in_a_row(Board):
@@ -18,6 +17,10 @@ class Five_in_a_row(Board):
                                [[j == 4 for j in range(9)] for _ in range(9)],
                                [[i + j == 8 for j in range(9)] for i in range(9)]])
     MAX_SCORES = 99999
+    SUPPORTS_PUSH = True
+    SUPPORTS_NULL_MOVE = True
+    # The last moves of the players (is_win and evaluate look around them)
+    STATE_FORMAT = 'HH'
 
     def __init__(self, size: int = 15, turn: int = 1, field: np.ndarray = None, moves: list[list[Move]] = None,
                  legal_moves: set = None):
@@ -31,7 +34,7 @@ class Five_in_a_row(Board):
         """
         if field is None:
             # If creating new empty field
-            field = np.array([[Piece(0) for _ in range(size)] for _ in range(size)], dtype=object)
+            field = np.zeros((size, size), dtype=np.int8)
             legal_moves = {(size // 2, size // 2)}
             moves = [[], []]
         self._field = field
@@ -41,24 +44,88 @@ class Five_in_a_row(Board):
         self._moves = moves
         self.win_pos = []
 
+    def _get_state(self) -> tuple:
+        return tuple(encode_location(moves[-1] if moves else None, self._size) for moves in self._moves)
+
+    @classmethod
+    def _from_state(cls, size: int, turn: int, field: np.ndarray, state: tuple) -> Board:
+        # Only the last moves of the history are kept
+        moves = [[location] if location is not None else [] for location in
+                 (decode_location(code, size) for code in state)]
+        legal_moves = empty_cells_near(field)
+        if field[size // 2, size // 2] == 0:
+            # The first move of the game
+            legal_moves.add((size // 2, size // 2))
+        return cls(size, turn, field, moves, legal_moves)
+
+    def copy(self) -> Board:
+        board = super().copy()
+        board._legal_moves = self._legal_moves.copy()
+        board._moves = [self._moves[0].copy(), self._moves[1].copy()]
+        return board
+
     def move(self, location: Move):
+        board = self.copy()
+        board._apply(location)
+        return board
+
+    def _apply(self, location: Move):
         x, y = location
         if self._field[x][y] != 0:
             raise(IndexError('Current location (%d, %d) is already occupied' % location))
-        new_field = self._field.copy()
-        new_field[x][y] = Piece(self.turn)
-        new_turn = self.last_turn
-        new_moves = deepcopy(self._moves)
-        new_moves[self.turn - 1].append(location)
-        legal_moves = self._legal_moves.copy()
-        if location in legal_moves:
-            # For the AI, it is only necessary to control key positions in the center and adjacent to the moves.
-            legal_moves.remove(location)
+        # For the AI, it is only necessary to control key positions in the center and adjacent to the moves.
         # Update moves with nearest empty positions
-        legal_moves.update([(x, y) for x, y in self.get_neighbours(location) if new_field[x][y] == 0])
-        return Five_in_a_row(self._size, new_turn, new_field, new_moves, legal_moves)
+        added_moves = [(i, j) for i, j in self.get_neighbours(location)
+                       if self._field[i][j] == 0 and (i, j) != location and (i, j) not in self._legal_moves]
+        record = (self._turn, self._field_hash, location in self._legal_moves, added_moves)
+        self._set_cell(location, self.turn)
+        self._moves[self.turn - 1].append(location)
+        self._legal_moves.discard(location)
+        self._legal_moves.update(added_moves)
+        self._turn = self.last_turn
+        return record
+
+    def _revert(self, record):
+        self._turn, field_hash, was_legal, added_moves = record
+        location = self._moves[self._turn - 1].pop()
+        self._field[location] = 0
+        self._field_hash = field_hash
+        self._legal_moves.difference_update(added_moves)
+        if was_legal:
+            self._legal_moves.add(location)
 
     @property
+    def can_null_move(self) -> bool:
+        # Evaluation and checking of win need the last move of the player, who passes
+        return bool(self._legal_moves) and len(self._moves[self._turn - 1]) > 0
+
+    def _apply_null(self):
+        record = self._turn
+        self._turn = self.last_turn
+        return record
+
+    def _revert_null(self, record):
+        self._turn = record
+
+    @property
+    def evaluation_key(self) -> int:
+        # Evaluation counts scores near the last move, so the move is a part of the key
+        last_player_moves = self._moves[self.last_turn - 1]
+        if len(last_player_moves) == 0:
+            return self.hash_key
+        x, y = last_player_moves[-1]
+        return self.hash_key ^ Zobrist.get(self._size).cells[x][y][Zobrist.VALUES - 1]
+
+    @property
+    def empty_count(self) -> int:
+        return int(np.count_nonzero(self._field == 0))
+
+    def final_scores(self, player: int) -> float:
+        if self.is_win:
+            return 1 if self.last_turn == player else -1
+        return 0
+
+    @cached_state
     def is_win(self) -> bool:
         # Checking the area near every non-border move of the current player with every winning pattern.
         last_player = self.last_turn
@@ -81,11 +148,35 @@ class Five_in_a_row(Board):
                         for k in range(-2, 3):
                             self.win_pos.append((x + k * dx, y + k * dy))
                         return True
+        return False
 
-    @property
+    @cached_state
     def is_draw(self) -> bool:
         return len(self.legal_moves) == 0
 
+    def order_moves(self, moves: list[Move]) -> list[Move]:
+        # Cells which make the longest lines (own lines or opponent's lines to block them) are searched first.
+
+        rays = self.geometry.rays
+
+        def priority(move):
+            x, y = move
+            best_line = 0
+            # Opposite rays are adjacent, so every pair of rays is a line through the cell
+            for direction in range(0, len(Geometry.DIRECTIONS), 2):
+                for player in (1, 2):
+                    line = 0
+                    for ray in rays[x][y][direction:direction + 2]:
+                        for cell in ray:
+                            if self._field[cell] != player:
+                                break
+                            line += 1
+                    # Own lines are a bit more important
+                    best_line = max(best_line, line + (0.5 if player == self.turn else 0))
+            return best_line
+
+        return sorted(moves, key=priority, reverse=True)
+
     def count_scores(self, player: int) -> float:
         # Checking the area near every non-border move of the current player with every winning pattern.
         x, y = self._moves[self.last_turn - 1][-1]
@@ -98,7 +189,7 @@ class Five_in_a_row(Board):
         ry = min(y + 5, 15)
         window = (self._field[lx:rx, ly:ry]).copy()
         # When scores counting for player this will increase players scores by blocking opponent
-        window[x-lx][y-ly] = Piece(player)
+        window[x-lx][y-ly] = player
         for template in self.SCORE_TEMPLATES:
             # Resize template for borders
             border_template = template[4-x+lx:4+rx-x, 4-y+ly:4+ry-y]
@@ -113,15 +204,15 @@ class Five_in_a_row(Board):
                 if enemy_pieces > 0 or own_pieces == 0:
                     continue
                 if own_pieces == 1:
-                    template_scores = max(randint(1, 20), template_scores)
+                    template_scores = max(20, template_scores)
                 elif own_pieces == 2:
-                    template_scores = max(randint(190, 200), template_scores)
+                    template_scores = max(200, template_scores)
                 elif own_pieces == 3:
-                    template_scores = max(randint(2990, 3000), template_scores)
+                    template_scores = max(3000, template_scores)
                 elif own_pieces == 4 and (part[0] == 0 or part[-1] == 0):
-                    template_scores = max(randint(6990, 7000), template_scores)
+                    template_scores = max(7000, template_scores)
                 elif own_pieces == 4:
-                    template_scores = max(randint(1990, 2000), template_scores)
+                    template_scores = max(2000, template_scores)
                 elif own_pieces == 5:
                     template_scores = max(99999, template_scores)
             total_scores += template_scores
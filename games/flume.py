@@ -1,16 +1,23 @@
 # -*- coding: utf-8 -*-
 
+from typing import Optional
+
 import numpy as np
 
-from games.abstracts import Piece, Board, Move
+from games.abstracts import Piece, Board, Move, Zobrist, cached_state, encode_location, decode_location
 
 
 class Gem(Piece):
+    __slots__ = ()
     NUM2STR = ['_', 'G', 'B', 'K']
 
 
 class Flume(Board):
     MAX_SCORES = 5
+    SUPPORTS_PUSH = True
+    PIECE = Gem
+    # Last move
+    STATE_FORMAT = 'H'
 
     def __init__(self, size: int = 13, turn: int = 1, field: np.ndarray = None, legal_moves: set = None,
                  last_move: Move = (0, 0)):
@@ -25,13 +32,13 @@ class Flume(Board):
         """
         if field is None:
             # If creating new empty field
-            field = np.array([[Gem(0) for _ in range(size)] for _ in range(size)], dtype=object)
+            field = np.zeros((size, size), dtype=np.int8)
             # Put neutral gems
             for k in range(size):
-                field[0][k] = Gem(3)
-                field[size - 1][k] = Gem(3)
-                field[k][0] = Gem(3)
-                field[k][size - 1] = Gem(3)
+                field[0][k] = 3
+                field[size - 1][k] = 3
+                field[k][0] = 3
+                field[k][size - 1] = 3
             legal_moves = {(i, j) for i in range(1, size - 1)
                            for j in range(1, size - 1)}
         self._field = field
@@ -42,37 +49,82 @@ class Flume(Board):
         self.last_move = last_move
         # Recount gems
         for i in range(3):
-            self._gem_counters[i] = (self._field == i).sum()
+            self._gem_counters[i] = int((self._field == i).sum())
+
+    def _get_state(self) -> tuple:
+        return encode_location(self.last_move, self._size),
+
+    @classmethod
+    def _from_state(cls, size: int, turn: int, field: np.ndarray, state: tuple) -> Board:
+        legal_moves = {(x, y) for x, y in np.argwhere(field == 0).tolist()}
+        return cls(size, turn, field, legal_moves, decode_location(state[0], size))
 
     @property
     def get_gem_count(self):
         return self._gem_counters[1], self._gem_counters[2]
 
+    def copy(self) -> Board:
+        board = super().copy()
+        board._legal_moves = self._legal_moves.copy()
+        board._gem_counters = self._gem_counters.copy()
+        return board
+
     def move(self, location: Move):
+        board = self.copy()
+        board._apply(location)
+        return board
+
+    def _apply(self, location: Move):
         if location not in self._legal_moves:
             raise (IndexError('Current location (%d, %d) is already occupied' % location))
         x, y = location
-        new_legal_moves = set(self.legal_moves.copy())
-        new_legal_moves.remove((x, y))
-        new_field = self._field.copy()
-        new_field[x][y] = Gem(self.turn)
+        record = (self._turn, self._field_hash, self.last_move, location)
         # If new gem has at least 3 horizontally or vertically neighbours gems (any color) then make additional move
-        if len([True for i, j in self.get_neighbours(location) if (i == x or j == y) and self._field[i][j] != 0]) > 2:
+        if sum(self._field[cell] != 0 for cell in self.geometry.orthogonal[x][y]) > 2:
             new_turn = self.turn
         else:
             new_turn = self.last_turn
-        return Flume(self._size, new_turn, new_field, new_legal_moves, location)
+        self._legal_moves.remove(location)
+        self._set_cell(location, self.turn)
+        self._gem_counters[0] -= 1
+        self._gem_counters[self.turn] += 1
+        self._turn = new_turn
+        self.last_move = location
+        return record
+
+    def _revert(self, record):
+        self._turn, self._field_hash, self.last_move, location = record
+        self._field[location] = 0
+        self._gem_counters[0] += 1
+        self._gem_counters[self._turn] -= 1
+        self._legal_moves.add(location)
+
+    @property
+    def evaluation_key(self) -> int:
+        # Evaluation looks for additional moves near the last move, so the move is a part of the key
+        x, y = self.last_move
+        return self.hash_key ^ Zobrist.get(self._size).cells[x][y][Zobrist.VALUES - 1]
 
     @property
+    def empty_count(self) -> int:
+        return self._gem_counters[0]
+
+    def final_scores(self, player: int) -> float:
+        return self._gem_counters[player] - self._gem_counters[Piece.opposite(player)]
+
+    def order_endgame_moves(self, moves: list[Move]) -> list[Move]:
+        return self._order_by_parity(self.order_moves(moves))
+
+    @cached_state
     def is_win(self) -> bool:
-        if self._gem_counters[0] == 0:
-            if self._gem_counters[1] > self._gem_counters[2]:
-                self._turn = 2
-                return True
-            if self._gem_counters[2] > self._gem_counters[1]:
-                self._turn = 1
-                return True
-        return False
+        return self._gem_counters[0] == 0 and self._gem_counters[1] != self._gem_counters[2]
+
+    @property
+    def winner(self) -> Optional[int]:
+        # The player with more gems wins (not the player of the last move)
+        if not self.is_win:
+            return None
+        return 1 if self._gem_counters[1] > self._gem_counters[2] else 2
 
     @property
     def is_draw(self) -> bool:
@@ -90,13 +142,13 @@ class Flume(Board):
         # Counting scores for new additional moves
         additional_scores = 0
         # Searching positions around last move
+        orthogonal = self.geometry.orthogonal
         for move in self.get_neighbours(self.last_move):
             x, y = move
             # If there is no gem
             if self._field[move] == 0:
                 # If new gem has at least 3 horizontally or vertically neighbours gems (any color)
-                if len([True for i, j in self.get_neighbours(move) if
-                        (i == x or j == y) and self._field[i][j] != 0]) > 2:
+                if sum(self._field[cell] != 0 for cell in orthogonal[x][y]) > 2:
                     # Increase bonus
                     additional_scores += 1
         if self.turn == player:
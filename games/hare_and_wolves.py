@@ -4,10 +4,12 @@ from collections import deque
 
 import numpy as np
 
-from games.abstracts import Piece, Board, Move
+from games.abstracts import Piece, Board, Move, cached_state
 
 
 class Hare(Piece):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(1)
 
@@ -16,6 +18,8 @@ class Hare(Piece):
 
 
 class Wolf(Piece):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(2)
 
@@ -25,6 +29,11 @@ class Wolf(Piece):
 
 class Hare_and_wolves(Board):
     _size = 8
+    SUPPORTS_PUSH = True
+    PAIR_MOVES = True
+    # Players can't skip turn and the hare is often caught because it must move (zugzwang)
+    SUPPORTS_NULL_MOVE = False
+    PIECES = (Piece, Hare, Wolf)
 
     def __init__(self, turn: int = 1, field: np.ndarray = None, hare_pos: Move = None, wolves_poses: list[Move] = None,
                  *args, **kwargs):
@@ -41,18 +50,31 @@ class Hare_and_wolves(Board):
         :param wolves_poses: List of locations of wolves.
         """
         if field is None:
-            field = np.array([[Piece(0) for _ in range(8)] for _ in range(8)], dtype=object)
+            field = np.zeros((8, 8), dtype=np.int8)
             # Lists of animals
             hare_pos = (7, 3)
-            field[hare_pos] = Hare()
+            field[hare_pos] = 1
             wolves_poses = [(0, 0), (0, 2), (0, 4), (0, 6)]
             for wolf_pos in wolves_poses:
-                field[wolf_pos] = Wolf()
+                field[wolf_pos] = 2
         self._hare_pos = hare_pos
         self._wolves_poses = wolves_poses
         self._field = field
         self._turn = turn
 
+    def to_piece(self, code: int) -> Piece:
+        return self.PIECES[code].get()
+
+    @classmethod
+    def _from_state(cls, size: int, turn: int, field: np.ndarray, state: tuple) -> Board:
+        hare_pos = tuple(np.argwhere(field == 1)[0].tolist())
+        return cls(turn, field, hare_pos, [(x, y) for x, y in np.argwhere(field == 2).tolist()])
+
+    def copy(self) -> Board:
+        board = super().copy()
+        board._wolves_poses = self._wolves_poses.copy()
+        return board
+
     def move(self, locations: tuple[Move, Move]) -> Board:
         """
         Returns board with next state after move.
@@ -60,8 +82,12 @@ class Hare_and_wolves(Board):
         :param locations: tuple pf location of piece and its destination location
         :return: copy of board with new state
         """
+        board = self.copy()
+        board._apply(locations)
+        return board
+
+    def _apply(self, locations: tuple[Move, Move]):
         animal_pos, destination = locations
-        new_field = self._field.copy()
         if max(abs(destination[0] - animal_pos[0]), abs(destination[1] - animal_pos[1])) != 1:
             raise IndexError('Bad move %s! Too long move.' % str(locations))
         if self.turn == 1 and self._field[destination] != 0:
@@ -71,19 +97,26 @@ class Hare_and_wolves(Board):
             raise IndexError('Bad move %s! Wolves can move only to lower empty cells.' % str(locations))
         if sum(destination) != sum(animal_pos) and destination[0] - destination[1] != animal_pos[0] - animal_pos[1]:
             raise IndexError('Bad move %s! Can move only to adjacent diagonal cell.' % str(locations))
-        new_field[animal_pos], new_field[destination] = new_field[destination], new_field[animal_pos]
-        new_turn = self.last_turn
+        record = (self._turn, self._field_hash, locations)
+        animal, empty = self._field[animal_pos], self._field[destination]
+        self._set_cell(animal_pos, empty)
+        self._set_cell(destination, animal)
         if self.turn == 1:
-            new_hare_pos = destination
-            new_wolves_pos = self._wolves_poses.copy()
+            self._hare_pos = destination
+        else:
+            self._wolves_poses[self._wolves_poses.index(animal_pos)] = destination
+        self._turn = self.last_turn
+        return record
+
+    def _revert(self, record):
+        self._turn, self._field_hash, (animal_pos, destination) = record
+        self._field[animal_pos], self._field[destination] = self._field[destination], self._field[animal_pos]
+        if self._turn == 1:
+            self._hare_pos = animal_pos
         else:
-            new_hare_pos = self._hare_pos
-            i = self._wolves_poses.index(animal_pos)
-            new_wolves_pos = self._wolves_poses.copy()
-            new_wolves_pos[i] = destination
-        return Hare_and_wolves(new_turn, new_field, new_hare_pos, new_wolves_pos)
+            self._wolves_poses[self._wolves_poses.index(destination)] = animal_pos
 
-    @property
+    @cached_state
     def is_win(self) -> bool:
         if self.last_turn == 1 and (self._hare_pos[0] == 0 or self.legal_moves == []):
             return True
@@ -95,7 +128,7 @@ class Hare_and_wolves(Board):
     def is_draw(self) -> bool:
         return False
 
-    @property
+    @cached_state
     def legal_moves(self) -> list[tuple[Move, Move]]:
         # Returns empty adjacent diagonal cells.
         if self.turn == 1:
@@ -119,6 +152,7 @@ class Hare_and_wolves(Board):
         to_check.append((self._hare_pos, path_length))
         checked = set()
         can_get_top = False
+        diagonal = self.geometry.diagonal
         while to_check:
             pos, path_length = to_check.popleft()
             # If BFS gets top then stop
@@ -126,9 +160,9 @@ class Hare_and_wolves(Board):
                 can_get_top = True
                 break
             checked.add(pos)
-            for x, y in self.get_neighbours(pos):
+            for x, y in diagonal[pos[0]][pos[1]]:
                 # Only empty not checked diagonals
-                if self._field[x][y] == 0 and x != pos[0] and y != pos[1] and (x, y) not in checked:
+                if self._field[x][y] == 0 and (x, y) not in checked:
                     to_check.append(((x, y), path_length + 1))
         if can_get_top:
             # How long is the hare's path to the top
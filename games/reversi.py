@@ -1,15 +1,24 @@
 # -*- coding: utf-8 -*-
 
+from typing import Optional
+
 import numpy as np
 
-from games.abstracts import Piece, Board, Move
+from games.abstracts import Piece, Board, Move, Geometry, cached_state, encode_location, decode_location, \
+    empty_cells_near
 
 
 class Figure(Piece):
+    __slots__ = ()
     NUM2STR = ['0', '+', '-']
 
 
 class Reversi(Board):
+    SUPPORTS_PUSH = True
+    SUPPORTS_NULL_MOVE = True
+    PIECE = Figure
+    # Last move
+    STATE_FORMAT = 'H'
 
     def __init__(self, size: int = 15, turn: int = 1, field: np.ndarray = None, boundary_moves: set = None,
                  last_move: Move = None):
@@ -24,11 +33,11 @@ class Reversi(Board):
         """
         if field is None:
             # If creating new empty field
-            field = np.array([[Figure(0) for _ in range(size)] for _ in range(size)], dtype=object)
-            field[size // 2 - 1][size // 2 - 1] = Figure(1)
-            field[size // 2][size // 2] = Figure(1)
-            field[size // 2 - 1][size // 2] = Figure(2)
-            field[size // 2][size // 2 - 1] = Figure(2)
+            field = np.zeros((size, size), dtype=np.int8)
+            field[size // 2 - 1][size // 2 - 1] = 1
+            field[size // 2][size // 2] = 1
+            field[size // 2 - 1][size // 2] = 2
+            field[size // 2][size // 2 - 1] = 2
             boundary_moves = {(i, j) for i in range(size // 2 - 2, size // 2 + 2)
                               for j in range(size // 2 - 2, size // 2 + 2) if field[i][j] == 0}
         self._field = field
@@ -40,7 +49,25 @@ class Reversi(Board):
         self.last_move = last_move
         # Recount gems
         for i in range(3):
-            self._gem_counters[i] = (self._field == i).sum()
+            self._gem_counters[i] = int((self._field == i).sum())
+        self.update_legal_moves()
+
+    def _get_state(self) -> tuple:
+        return encode_location(self.last_move, self._size),
+
+    @classmethod
+    def _from_state(cls, size: int, turn: int, field: np.ndarray, state: tuple) -> Board:
+        # Cells along the border of placed pieces are all empty cells adjacent to pieces
+        board = cls(size, turn, field, empty_cells_near(field), decode_location(state[0], size))
+        # Turn is already passed if the player had no moves
+        board._turn = turn
+        return board
+
+    @property
+    def get_gem_count(self):
+        return self._gem_counters[1], self._gem_counters[2]
+
+    def update_legal_moves(self):
         self.check_legal_moves()
         # When player can't do any move return turn
         if len(self._legal_moves) == 0:
@@ -50,80 +77,130 @@ class Reversi(Board):
         if len(self._legal_moves) == 0:
             self._gem_counters[0] = 0
 
-    @property
-    def get_gem_count(self):
-        return self._gem_counters[1], self._gem_counters[2]
-
     def check_legal_moves(self):
         self._legal_moves = []
+        field, player, opponent = self._field, self.turn, self.last_turn
+        rays = Geometry.get(self._size).rays
         for x, y in self._boundary_moves:
             # Flag that move is added to stop checking
             move_added = False
             # Check all directions
-            for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)):
-                k = 1
-                next_x, next_y = x + k * dx, y + k * dy
+            for ray in rays[x][y]:
                 # Flag to know when we reached reverse color
                 got_reverse_color = False
-                while 0 <= next_x < self._size and 0 <= next_y < self._size and self._field[next_x][next_y] != 0:
-                    if self._field[next_x][next_y] == self.last_turn:
+                for cell in ray:
+                    if field[cell] == opponent:
                         got_reverse_color = True
                     else:
-                        if self._field[next_x][next_y] == self.turn and got_reverse_color:
+                        if field[cell] == player and got_reverse_color:
                             # We can change color of at least one piece
                             self._legal_moves.append((x, y))
                             move_added = True
                         break
-                    k += 1
-                    next_x, next_y = x + k * dx, y + k * dy
                 if move_added:
                     break
 
+    def copy(self) -> Board:
+        board = super().copy()
+        board._boundary_moves = self._boundary_moves.copy()
+        board._gem_counters = self._gem_counters.copy()
+        return board
+
     def move(self, location: Move):
+        board = self.copy()
+        board._apply(location)
+        return board
+
+    def _apply(self, location: Move):
         if location not in self._legal_moves:
             raise (IndexError('Current location (%d, %d) is already occupied' % location))
         x, y = location
-        new_boundary_moves = self._boundary_moves.copy()
-        for i, j in self.get_neighbours((x, y)):
-            if 0 <= i < self._size and 0 <= j < self._size and self._field[i][j] == 0:
-                new_boundary_moves.add((i, j))
-        new_boundary_moves.remove((x, y))
-        new_field = self._field.copy()
-        new_field[x][y] = Figure(self.turn)
-        for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)):
-            k = 1
-            next_x, next_y = x + k * dx, y + k * dy
-            # Flag to know when we reached reverse color
-            got_reverse_color = False
-            while 0 <= next_x < self._size and 0 <= next_y < self._size and self._field[next_x][next_y] != 0:
-                if self._field[next_x][next_y] == self.last_turn:
-                    got_reverse_color = True
-                else:
-                    if self._field[next_x][next_y] == self.turn and got_reverse_color:
-                        next_x -= dx
-                        next_y -= dy
-                        while next_x != x or next_y != y:
-                            new_field[next_x][next_y] = Figure(self.turn)
-                            next_x -= dx
-                            next_y -= dy
+        # Pieces of the opponent to flip
+        flipped = []
+        for ray in Geometry.get(self._size).rays[x][y]:
+            for k, cell in enumerate(ray):
+                if self._field[cell] != self.last_turn:
+                    if self._field[cell] == self.turn and k > 0:
+                        # Pieces of the opponent between the move and the piece of the player
+                        flipped.extend(ray[:k])
                     break
-                k += 1
-                next_x, next_y = x + k * dx, y + k * dy
-        new_turn = self.last_turn
-        return Reversi(self._size, new_turn, new_field, new_boundary_moves, location)
+        new_boundary_moves = [(i, j) for i, j in self.get_neighbours(location)
+                              if self._field[i][j] == 0 and (i, j) not in self._boundary_moves]
+        changed = [location] + flipped
+        record = (self._turn, self._field_hash, self._legal_moves, tuple(self._gem_counters), self.last_move,
+                  new_boundary_moves, changed)
+        self._boundary_moves.update(new_boundary_moves)
+        self._boundary_moves.remove(location)
+        for cell in changed:
+            self._set_cell(cell, self.turn)
+        self._gem_counters[0] -= 1
+        self._gem_counters[self.turn] += len(flipped) + 1
+        self._gem_counters[self.last_turn] -= len(flipped)
+        self._turn = self.last_turn
+        self.last_move = location
+        self.update_legal_moves()
+        return record
+
+    def _revert(self, record):
+        self._turn, self._field_hash, self._legal_moves, gem_counters, self.last_move, new_boundary_moves, cells = record
+        self._gem_counters = list(gem_counters)
+        # The first cell is the move, the other cells are flipped pieces of the opponent
+        location = cells[0]
+        self._field[location] = 0
+        for cell in cells[1:]:
+            self._field[cell] = Piece.opposite(self._turn)
+        self._boundary_moves.difference_update(new_boundary_moves)
+        self._boundary_moves.add(location)
+
+    def _apply_null(self):
+        record = self._turn, self._legal_moves, self._gem_counters[0]
+        self._turn = self.last_turn
+        self.update_legal_moves()
+        return record
+
+    def _revert_null(self, record):
+        self._turn, self._legal_moves, self._gem_counters[0] = record
+
+    def order_moves(self, moves: list[Move]) -> list[Move]:
+        last = self._size - 1
+
+        def priority(move):
+            x, y = move
+            border_x, border_y = x in (0, last), y in (0, last)
+            if border_x and border_y:
+                # Corners can't be flipped
+                return 2
+            if (border_x or x in (1, last - 1)) and (border_y or y in (1, last - 1)):
+                # Cells near corners give corners to the opponent
+                return -1
+            if border_x or border_y:
+                return 1
+            return 0
+
+        return sorted(moves, key=priority, reverse=True)
 
     @property
+    def empty_count(self) -> int:
+        return self._gem_counters[0]
+
+    def final_scores(self, player: int) -> float:
+        return self._gem_counters[player] - self._gem_counters[Piece.opposite(player)]
+
+    def order_endgame_moves(self, moves: list[Move]) -> list[Move]:
+        return self._order_by_parity(self.order_moves(moves))
+
+    @cached_state
     def is_win(self) -> bool:
-        if self._gem_counters[0] == 0:
-            if self._gem_counters[1] > self._gem_counters[2]:
-                self._turn = 2
-                return True
-            if self._gem_counters[2] > self._gem_counters[1]:
-                self._turn = 1
-                return True
-        return False
+        return self._gem_counters[0] == 0 and self._gem_counters[1] != self._gem_counters[2]
 
     @property
+    def winner(self) -> Optional[int]:
+        # The player with more gems wins (not the player of the last move)
+        if not self.is_win:
+            return None
+        return 1 if self._gem_counters[1] > self._gem_counters[2] else 2
+
+    @cached_state
     def is_draw(self) -> bool:
         if self._gem_counters[0] == 0:
             return self._gem_counters[1] == self._gem_counters[2]
@@ -1,21 +1,25 @@
 # -*- coding: utf-8 -*-
 
-from copy import deepcopy
+from typing import Optional
 
 import numpy as np
 
-from games.abstracts import Piece, Board, Move
+from games.abstracts import Piece, Board, Move, Geometry, cached_state, encode_location, decode_location
 
 
 class Tile(Piece):
+    __slots__ = ()
     NUM2STR = ['_', 'W', 'G']
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
 
 class Talpa(Board):
     MAX_SCORES = 100
+    SUPPORTS_PUSH = True
+    SUPPORTS_NULL_MOVE = True
+    PAIR_MOVES = True
+    PIECE = Tile
+    # Last move
+    STATE_FORMAT = 'H'
 
     def __init__(self, size: int = 8, turn: int = 1, field: np.ndarray = None,  paths: list[set[Move]] = None,
                  last_move: Move = None):
@@ -30,30 +34,32 @@ class Talpa(Board):
         :param last_move: Position of last move.
         """
         if field is None:
-            field = np.array([[Tile(1) if (i+j) % 2 else Tile(2) for j in range(size)] for i in range(size)],
-                             dtype=object)
+            field = np.array([[1 if (i+j) % 2 else 2 for j in range(size)] for i in range(size)], dtype=np.int8)
         self._field = field
         self._size = size
         self._turn = turn
         self.paths = paths if paths else []
         self.last_move = last_move
+        self.update_legal_moves()
+        # Count lens of paths for game evaluating
+        self.paths_lens = []
+        self.count_paths_lengths()
+
+    def update_legal_moves(self):
         # Determine the legal moves
         attack_moves = []
         remove_moves = []
-        for i in range(self._size):
-            for j in range(self._size):
-                if self._field[i][j] == self._turn:
-                    # Remove own tile
-                    remove_moves.append(((i, j), (i, j)))
-                    for x, y in ((i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)):
-                        if 0 <= x < self._size and 0 <= y < self._size and self._field[x][y] == self.last_turn:
-                            # Can attack enemy near
-                            attack_moves.append(((i, j), (x, y)))
+        for i, j in np.argwhere(self._field == self._turn).tolist():
+            # Remove own tile
+            remove_moves.append(((i, j), (i, j)))
+            for x, y in ((i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)):
+                if 0 <= x < self._size and 0 <= y < self._size and self._field[x][y] == self.last_turn:
+                    # Can attack enemy near
+                    attack_moves.append(((i, j), (x, y)))
         # First phase of game - attack enemy, second - remove own tiles
         self._legal_moves = attack_moves if len(attack_moves) > 0 else remove_moves
-        # Count lens of paths for game evaluating
-        self.paths_lens = []
-        self.count_paths_lengths()
+        # Moves are checked by push against the set, so the list isn't scanned
+        self._legal_set = set(self._legal_moves)
 
     def count_paths_lengths(self):
         for path in self.paths:
@@ -63,6 +69,28 @@ class Talpa(Board):
             max_ver = max(map(lambda x: x[1], path))
             self.paths_lens.append(((max_hor - min_hor + 1), (max_ver - min_ver + 1)))
 
+    def _get_state(self) -> tuple:
+        return encode_location(self.last_move, self._size),
+
+    @classmethod
+    def _from_state(cls, size: int, turn: int, field: np.ndarray, state: tuple) -> Board:
+        # Paths are groups of empty tiles connected horizontally or vertically
+        orthogonal = Geometry.get(size).orthogonal
+        paths = []
+        found = set()
+        for x, y in np.argwhere(field == 0).tolist():
+            if (x, y) in found:
+                continue
+            path = [(x, y)]
+            found.add((x, y))
+            for i, j in path:
+                for cell in orthogonal[i][j]:
+                    if field[cell] == 0 and cell not in found:
+                        found.add(cell)
+                        path.append(cell)
+            paths.append(set(path))
+        return cls(size, turn, field, paths, decode_location(state[0], size))
+
     def move(self, locations: tuple[Move, Move]) -> Board:
         """
         Returns board with next state after move.
@@ -70,15 +98,18 @@ class Talpa(Board):
         :param locations: tuple pf location of piece and its destination location
         :return: copy of board with new state
         """
-        if locations not in self._legal_moves:
+        board = self.copy()
+        board._apply(locations)
+        return board
+
+    def _apply(self, locations: tuple[Move, Move]):
+        if locations not in self._legal_set:
             raise IndexError('Bad move %s!' % str(locations))
         tile_pos, destination = locations
-        new_field = self._field.copy()
-        new_paths = deepcopy(self.paths)
-        new_turn = self.last_turn
-        # Change tiles positions
-        new_field[destination] = new_field[tile_pos]
-        new_field[tile_pos] = Tile(0)
+        record = (self._turn, self._field_hash, self._legal_moves, self._legal_set, self.paths, self.paths_lens,
+                  self.last_move, locations, self._field[destination])
+        # Paths are changed in a new list, changed paths are copied, so the old paths are kept to undo the move
+        new_paths = self.paths.copy()
 
         # There is three possible situation with paths (empty tiles) around removed tile:
         i, j = tile_pos
@@ -89,7 +120,7 @@ class Talpa(Board):
                     # 1) One path - add current empty tile to this path
                     for k in range(len(new_paths)):
                         if (x, y) in new_paths[k]:
-                            new_paths[k].add((i, j))
+                            new_paths[k] = new_paths[k] | {(i, j)}
                             first_path_index = k
                             break
                 else:
@@ -97,7 +128,7 @@ class Talpa(Board):
                     # and remove other paths from new_paths
                     for k in range(len(new_paths)):
                         if (x, y) in new_paths[k] and k != first_path_index:
-                            new_paths[first_path_index] |= new_paths[k]
+                            new_paths[first_path_index] = new_paths[first_path_index] | new_paths[k]
                             new_paths.pop(k)
                             first_path_index = first_path_index if first_path_index < k else first_path_index - 1
                             break
@@ -105,21 +136,53 @@ class Talpa(Board):
         if first_path_index == -1:
             new_paths.append({(i, j), })
 
-        return Talpa(self._size, new_turn, new_field, new_paths, destination)
+        # Change tiles positions
+        self._set_cell(destination, self.turn)
+        self._set_cell(tile_pos, 0)
+        self._turn = self.last_turn
+        self.paths = new_paths
+        self.last_move = destination
+        self.update_legal_moves()
+        self.paths_lens = []
+        self.count_paths_lengths()
+        return record
+
+    def _revert(self, record):
+        (self._turn, self._field_hash, self._legal_moves, self._legal_set, self.paths, self.paths_lens,
+         self.last_move, (tile_pos, destination), destination_code) = record
+        self._field[destination] = destination_code
+        self._field[tile_pos] = self._turn
 
     @property
+    def can_null_move(self) -> bool:
+        # Only attacks of the first phase make position better, removing of own tiles may be forced to lose
+        return bool(self._legal_moves) and self._legal_moves[0][0] != self._legal_moves[0][1]
+
+    def _apply_null(self):
+        record = self._turn, self._legal_moves, self._legal_set
+        self._turn = self.last_turn
+        self.update_legal_moves()
+        return record
+
+    def _revert_null(self, record):
+        self._turn, self._legal_moves, self._legal_set = record
+
+    @cached_state
     def is_win(self) -> bool:
+        return self.winner is not None
+
+    @cached_state
+    def winner(self) -> Optional[int]:
         # Player best path
         player_len = max(map(lambda x: x[self.last_turn - 1], self.paths_lens)) if self.paths_lens else 0
         # Opponent best path
         opponent_len = max(map(lambda x: x[self.turn - 1], self.paths_lens)) if self.paths_lens else 0
         if opponent_len == self._size:
             # Opponent's victory in priority (even if the player should win)
-            self._turn = self.last_turn
-            return True
+            return self.turn
         if player_len == self._size:
-            return True
-        return False
+            return self.last_turn
+        return None
 
     @property
     def is_draw(self) -> bool:
@@ -1,13 +1,13 @@
 # -*- coding: utf-8 -*-
 
-from copy import deepcopy
-
 import numpy as np
 
-from games.abstracts import Piece, Board, Move
+from games.abstracts import Piece, Board, Move, Zobrist, cached_state, encode_location, decode_location
 
 
 class Virus(Piece):
+    __slots__ = ('is_dead', 'location')
+
     def __init__(self, player: int, location: Move = None, is_dead: bool = False):
         super().__init__(player)
         self.is_dead = is_dead
@@ -24,9 +24,15 @@ class Virus(Piece):
 
 class Virus_war(Board):
     MAX_SCORES = 5
+    SUPPORTS_PUSH = True
+    # Flag of dead virus in the cell code
+    DEAD = 4
+    FLAG_BITS = 1
+    # Number of player's remaining moves and the last move
+    STATE_FORMAT = 'BH'
 
     def __init__(self, size: int = 8, turn: int = 1, field: np.ndarray = None,
-                 pieces_lists: list[list[Virus]] = None, remaining_moves: int = 3, last_move: Move = None):
+                 pieces_lists: list[list[Move]] = None, remaining_moves: int = 3, last_move: Move = None):
         """
 
         A game board for checkers (English draughts).
@@ -34,12 +40,12 @@ class Virus_war(Board):
         :param size: Board size. If new board is empty
         :param turn: 1 or 2 for player number.
         :param field: Old field with new move. If a new board is obtained by making a move on the previous board.
-        :param pieces_lists: List of lists of players pieces.
+        :param pieces_lists: List of lists of players alive viruses locations.
         :param remaining_moves: Number of player's remaining moves.
         """
         self._size = size
         if field is None:
-            field = np.array([[Virus(0, (i, j)) for j in range(self._size)] for i in range(self._size)], dtype=object)
+            field = np.zeros((self._size, self._size), dtype=np.int8)
             pieces_lists = [[], []]
             last_move = (0, self._size - 1)
         self._pieces_lists = pieces_lists
@@ -50,53 +56,96 @@ class Virus_war(Board):
         # Search for legal moves
         self._legal_moves = self.get_moves_for_player(self.turn)
 
+    def to_piece(self, code: int) -> Piece:
+        return Virus(code & self.PLAYER_MASK, is_dead=bool(code & self.DEAD))
+
     def get_moves_for_player(self, player: int) -> set[Move]:
         """Returns set of legal moves for player"""
         checked = set()
-        player_locs = [piece.location for piece in self._pieces_lists[player - 1]]
+        player_locs = self._pieces_lists[player - 1].copy()
+        alive_opponent = self.last_turn
+        dead_opponent = self.last_turn | self.DEAD
         moves = set()
         while player_locs:
             loc = player_locs.pop()
             checked.add(loc)
             for move in self.get_neighbours(loc):
-                if (self._field[move] == self.last_turn and not self._field[move].is_dead) \
-                        or self._field[move] == 0:
+                code = self._field[move]
+                if code == alive_opponent or code == 0:
                     # Can do move only on nearest empty cell or on opponent not dead virus
                     moves.add(move)
-                elif self._field[move] == self.last_turn and self._field[move].is_dead \
-                        and move not in checked:
+                elif code == dead_opponent and move not in checked:
                     # The move is available through the chain of the opponent's deed viruses
                     player_locs.append(move)
-        if (self._field == player).sum() == 0:
+        if (self._field & self.PLAYER_MASK == player).sum() == 0:
             moves = {(self._size - 1, 0)} if player == 1 else {(0, self._size - 1)}
         return moves
 
+    def _get_state(self) -> tuple:
+        return self.remaining_moves, encode_location(self.last_move, self._size)
+
+    @classmethod
+    def _from_state(cls, size: int, turn: int, field: np.ndarray, state: tuple) -> Board:
+        # Alive viruses of the players
+        pieces_lists = [[(x, y) for x, y in np.argwhere(field == player).tolist()] for player in (1, 2)]
+        return cls(size, turn, field, pieces_lists, state[0], decode_location(state[1], size))
+
+    def copy(self) -> Board:
+        board = super().copy()
+        board._pieces_lists = [self._pieces_lists[0].copy(), self._pieces_lists[1].copy()]
+        return board
+
     def move(self, location: Move):
+        board = self.copy()
+        board._apply(location)
+        return board
+
+    def _apply(self, location: Move):
         if location not in self._legal_moves:
             raise (IndexError('Bad move (%d, %d)!' % location))
-        x, y = location
-        new_pieces_lists = deepcopy(self._pieces_lists)
-        new_field = deepcopy(self._field)
-        if new_field[x][y] == 0:
-            new_field[x][y] = Virus(self.turn, location)
-            new_pieces_lists[self.turn - 1].append(new_field[x][y])
-        elif new_field[x][y] == self.last_turn:
-            new_field[x][y].is_dead = True
-            for i, piece in enumerate(new_pieces_lists[self.last_turn - 1]):
-                if piece.location == location:
-                    new_pieces_lists[self.last_turn - 1].pop(i)
-                    break
+        old_code = self._field[location]
+        if old_code == 0:
+            new_code = self.turn
+            index = len(self._pieces_lists[self.turn - 1])
+        elif old_code == self.last_turn:
+            new_code = self.last_turn | self.DEAD
+            index = self._pieces_lists[self.last_turn - 1].index(location)
         else:
             raise (IndexError('Bad move (%d, %d)!' % location))
+        record = (self._turn, self._field_hash, self._legal_moves, self.remaining_moves, self.last_move,
+                  location, old_code, index)
+        self._set_cell(location, new_code)
+        if old_code == 0:
+            self._pieces_lists[self.turn - 1].append(location)
+        else:
+            self._pieces_lists[self.last_turn - 1].pop(index)
         if self.remaining_moves == 1:
-            new_turn = self.last_turn
-            new_remaining_moves = 3
+            self._turn = self.last_turn
+            self.remaining_moves = 3
+        else:
+            self.remaining_moves -= 1
+        self.last_move = location
+        # Search for legal moves
+        self._legal_moves = self.get_moves_for_player(self.turn)
+        return record
+
+    def _revert(self, record):
+        (self._turn, self._field_hash, self._legal_moves, self.remaining_moves, self.last_move,
+         location, old_code, index) = record
+        self._field[location] = old_code
+        if old_code == 0:
+            self._pieces_lists[self._turn - 1].pop()
         else:
-            new_turn = self.turn
-            new_remaining_moves = self.remaining_moves - 1
-        return Virus_war(self._size, new_turn, new_field, new_pieces_lists, new_remaining_moves, location)
+            self._pieces_lists[Piece.opposite(self._turn) - 1].insert(index, location)
 
-    @property
+    def _extra_hash(self, zobrist: Zobrist) -> int:
+        return zobrist.extras[self.remaining_moves]
+
+    def is_forcing(self, move: Move) -> bool:
+        # Killing of the opponent's virus changes mobility of both players
+        return self._field[move] == self.last_turn
+
+    @cached_state
     def is_win(self) -> bool:
         if len(self._legal_moves) == 0:
             return True
@@ -109,15 +158,8 @@ class Virus_war(Board):
 
     def evaluate(self, player: int) -> float:
         player_moves_count = len(self.get_moves_for_player(player))
-        opponent = Piece().opposite(player)
+        opponent = Piece.opposite(player)
         opponent_moves_count = len(self.get_moves_for_player(opponent))
-        player_killed = 0
-        opponent_killed = 0
-        for i in range(self._size):
-            for j in range(self._size):
-                if self._field[i][j].is_dead:
-                    if self._field[i][j] == opponent:
-                        player_killed += 1
-                    elif self._field[i][j] == player:
-                        opponent_killed += 1
+        player_killed = int((self._field == (opponent | self.DEAD)).sum())
+        opponent_killed = int((self._field == (player | self.DEAD)).sum())
         return player_moves_count + player_killed * 5 - opponent_moves_count - opponent_killed * 5
@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 """Contains abstract classes for PyQt forms"""
 
+import os
+
 from PyQt5 import QtWidgets, QtGui
 
 from basic.party import *
 from games.abstracts import Board
+from games.ai.config import EngineConfig, load_profiles, profile_path
 from gui.forms.game_form import Ui_GameForm
 
 
@@ -62,7 +65,10 @@ class AbstractCell(QtWidgets.QWidget):
 
 class AbstractGameForm(QtWidgets.QWidget, Ui_GameForm):
     """Basic class for game form with basic logic."""
-    DIFFICULTY_LEVELS = {'Легко': {'max_depth': 0}, 'Среднее': {'max_depth': 1}, 'Сложно': {'max_depth': 3}}
+    # The hardest levels are limited by time (in milliseconds), so they search as deep as they can in this time
+    # and ponder on the human's time. Levels may be replaced by profiles from the file of the game (profile_path).
+    DIFFICULTY_LEVELS = {'Легко': EngineConfig(max_depth=0), 'Среднее': EngineConfig(max_depth=1),
+                         'Сложно': EngineConfig(max_depth=5, time_budget_ms=3000, pondering=True)}
     BOARD_SIZES = ('8',)
     PLAYERS = ('Белые', 'Чёрные')
     RULES = "Здесь могла быть выша игра."
@@ -78,24 +84,41 @@ class AbstractGameForm(QtWidgets.QWidget, Ui_GameForm):
         self.setupUi(self)
         self.party = None
         self.size = None
+        self.difficulty_levels = self.load_difficulty_levels()
         self.setup_form()
         self.blocked = False
 
+    @classmethod
+    def load_difficulty_levels(cls) -> dict[str, EngineConfig]:
+        """Returns difficulty levels of the game with profiles from the file of the game (if it exists)."""
+        levels = dict(cls.DIFFICULTY_LEVELS)
+        path = profile_path(cls.Board_Class)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                levels.update(load_profiles(file))
+        return levels
+
     def setup_form(self):
-        self.difficultyLevelsCombo.addItems(self.DIFFICULTY_LEVELS.keys())
+        self.difficultyLevelsCombo.addItems(self.difficulty_levels.keys())
         self.sizesCombo.addItems(self.BOARD_SIZES)
         self.computerPlayerCombo.addItems(self.PLAYERS)
         self.rulesText.setText(self.RULES)
         self.startButton.clicked.connect(self.game_start)
 
+    def stop(self):
+        """Stops the party (AI search of the old party doesn't waste time)."""
+        if self.party is not None:
+            self.party.stop()
+
     def game_start(self):
+        self.stop()
         # Game settings
         is_AI = self.isComputer.isChecked()
-        difficulty_settings = self.DIFFICULTY_LEVELS[self.difficultyLevelsCombo.currentText()]
+        config = self.difficulty_levels[self.difficultyLevelsCombo.currentText()]
         self.size = int(self.sizesCombo.currentText())
         AI_player = self.computerPlayerCombo.currentIndex() + 1
         board = self.Board_Class(turn=1, size=self.size)
-        self.party = Party(board, is_AI, AI_player, difficulty_settings)
+        self.party = Party(board, is_AI, AI_player, config)
         self.party.sendGameField.connect(self.update_values)
         self.party.sendGameState.connect(self.update_state)
         self.party.unblockGameForm.connect(self.unblocking)
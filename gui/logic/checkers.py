@@ -16,7 +16,9 @@ class CheckersCell(HareCell):
 
 
 class CheckersForm(HareForm):
-    DIFFICULTY_LEVELS = {'Легко': {'max_depth': 0}, 'Среднее': {'max_depth': 2}, 'Сложно': {'max_depth': 4}}
+    # Chains of attacks are searched to the end by the quiescence search
+    DIFFICULTY_LEVELS = {'Легко': EngineConfig(max_depth=0), 'Среднее': EngineConfig(max_depth=2, quiescence_depth=6),
+                         'Сложно': EngineConfig(max_depth=8, time_budget_ms=3000, quiescence_depth=6, pondering=True)}
     BOARD_SIZES = ('8',)
     PLAYERS = ('Красные', 'Синие')
     RULES = "Английские шашки (чекерс).\n\n" \
@@ -36,7 +36,8 @@ class FiveCell(AbstractCell):
 
 
 class FiveForm(AbstractGameForm):
-    DIFFICULTY_LEVELS = {'Легко': {'randomizing': 20}, 'Среднее': {'randomizing': 5}, 'Сложно': {'randomizing': 0}}
+    DIFFICULTY_LEVELS = {'Легко': EngineConfig(temperature=0.2), 'Среднее': EngineConfig(temperature=0.05),
+                         'Сложно': EngineConfig(max_depth=2, time_budget_ms=3000, pondering=True)}
     BOARD_SIZES = ('15', '19')
     PLAYERS = ('Крестики', 'Нолики')
     RULES = "Пять в ряд (Гомоку).\n\n" \
@@ -15,8 +15,10 @@ class FlumeCell(ReversiCell):
 
 
 class FlumeForm(ReversiForm):
-    DIFFICULTY_LEVELS = {'Легко': {'max_depth': 0, 'randomizing': 20}, 'Среднее': {'max_depth': 1, 'randomizing': 5},
-                         'Сложно': {'max_depth': 1}}
+    DIFFICULTY_LEVELS = {'Легко': EngineConfig(max_depth=0, temperature=0.2),
+                         'Среднее': EngineConfig(max_depth=1, temperature=0.05),
+                         'Сложно': EngineConfig(max_depth=3, time_budget_ms=3000, pondering=True,
+                                                endgame_empties=12)}
     BOARD_SIZES = ('11', '13', '15')
     PLAYERS = ('Зелёные', 'Синие')
     RULES = "Флюм.\n\n" \
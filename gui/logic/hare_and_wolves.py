@@ -24,7 +24,8 @@ class HareCell(AbstractCell):
 
 
 class HareForm(AbstractGameForm):
-    DIFFICULTY_LEVELS = {'Легко': {'max_depth': 0}, 'Среднее': {'max_depth': 1}, 'Сложно': {'max_depth': 3}}
+    DIFFICULTY_LEVELS = {'Легко': EngineConfig(max_depth=0), 'Среднее': EngineConfig(max_depth=1),
+                         'Сложно': EngineConfig(max_depth=8, time_budget_ms=3000, pondering=True)}
     BOARD_SIZES = ('8',)
     PLAYERS = ('Заяц', 'Волки')
     RULES = "Заяц и волки.\n\n" \
@@ -59,7 +59,9 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def set_game(self, game_form_class):
         game_form: AbstractGameForm = game_form_class()
         if self.gameArea.layout().count() == 1:
-            self.gameArea.layout().itemAt(0).widget().setParent(None)
+            old_form: AbstractGameForm = self.gameArea.layout().itemAt(0).widget()
+            old_form.stop()
+            old_form.setParent(None)
         self.gameArea.layout().addWidget(game_form)
         game_form.resizeSignal.connect(self.resize)
         game_form.waitSignal.connect(self.show_progressbar)
@@ -27,7 +27,11 @@ class ReversiCell(AbstractCell):
 
 
 class ReversiForm(AbstractGameForm):
-    DIFFICULTY_LEVELS = {'Легко': {'max_depth': 0}, 'Среднее': {'max_depth': 2}, 'Сложно': {'max_depth': 3}}
+    DIFFICULTY_LEVELS = {'Легко': EngineConfig(max_depth=0),
+                         'Среднее': EngineConfig(max_depth=2, time_budget_ms=1500, pondering=True),
+                         'Сложно': EngineConfig(max_depth=6, time_budget_ms=3000, null_move=True,
+                                                late_move_reduction=True, pondering=True,
+                                                endgame_empties=12)}
     BOARD_SIZES = ('8', '10', '12')
     PLAYERS = ('Жёлтые', 'Фиолетовые')
     RULES = "Реверси (Отелло).\n\n" \
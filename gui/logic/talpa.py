@@ -16,8 +16,10 @@ class TalpaCell(HareCell):
 
 
 class TalpaForm(HareForm):
-    DIFFICULTY_LEVELS = {'Легко': {'max_depth': 0, 'randomizing': 20}, 'Среднее': {'max_depth': 1, 'randomizing': 5},
-                         'Сложно': {'max_depth': 1}}
+    DIFFICULTY_LEVELS = {'Легко': EngineConfig(max_depth=0, temperature=0.2),
+                         'Среднее': EngineConfig(max_depth=1, temperature=0.05),
+                         'Сложно': EngineConfig(max_depth=4, time_budget_ms=3000, null_move=True,
+                                                late_move_reduction=True, pondering=True)}
     BOARD_SIZES = ('6', '8', '10')
     PLAYERS = ('Белые', 'Жёлтые')
     RULES = "Тальпа.\n\n" \
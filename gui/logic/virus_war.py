@@ -16,8 +16,9 @@ class VirusCell(ReversiCell):
 
 
 class VirusForm(ReversiForm):
-    DIFFICULTY_LEVELS = {'Легко': {'max_depth': 0, 'randomizing': 20}, 'Среднее': {'max_depth': 0, 'randomizing': 5},
-                         'Сложно': {'max_depth': 0}}
+    DIFFICULTY_LEVELS = {'Легко': EngineConfig(max_depth=0, temperature=0.2),
+                         'Среднее': EngineConfig(max_depth=0, temperature=0.05),
+                         'Сложно': EngineConfig(max_depth=2, time_budget_ms=3000, quiescence_depth=2, pondering=True)}
     BOARD_SIZES = ('10', '11', '12', '13', '14', '15')
     PLAYERS = ('Зелёные', 'Фиолетовые')
     RULES = "Война вирусов.\n\n" \
@@ -1,8 +1,12 @@
-from random import choice
+import json
+from io import StringIO
+from random import choice, Random
+from time import time
 
 import pytest
 
 
+from games.abstracts import Geometry
 from games.checkers import Checkers
 from games.five_in_a_row import Five_in_a_row
 from games.flume import Flume
@@ -10,7 +14,17 @@ from games.hare_and_wolves import Hare_and_wolves
 from games.reversi import Reversi
 from games.talpa import Talpa
 from games.virus_war import Virus_war
-from games.ai.decision_rule import find_best_move
+from games.ai.analysis import analyse
+from games.ai.config import EngineConfig, load_profiles, save_profiles
+from games.ai.decision_rule import find_best_move, search_root, search_root_pvs, SearchContext, quiescence, \
+    alphabeta, Pruning, search_root_sampling
+from games.ai.endgame import solve_endgame
+from games.ai.evaluation_cache import EvaluationCache
+from games.ai.mcts import MonteCarloTreeSearch
+from games.ai.opening_book import OpeningBook, build_book
+from games.ai.parallel import search_lazy_smp, search_root_parallel
+from games.ai.search_handle import SearchHandle, ponder
+from games.ai.transposition import TranspositionTable, SharedTranspositionTable, EXACT, LOWER
 
 
 @pytest.fixture(params=[Checkers, Five_in_a_row, Flume, Hare_and_wolves,
@@ -34,7 +48,7 @@ class TestGame:
                 move = choice(board.legal_moves)
                 board = board.move(move)
                 if board.is_win:
-                    win_draw_counters[board.last_turn - 1] += 1
+                    win_draw_counters[board.winner - 1] += 1
                     break
                 elif board.is_draw:
                     win_draw_counters[-1] += 1
@@ -53,27 +67,58 @@ class TestGame:
         print(f"Draws: {win_draw_counters[2]}")
         print("_"*32)
 
-    @pytest.mark.parametrize("player_1", [{'max_depth': 0, 'randomizing': 20},
-                                          {'max_depth': 1, 'randomizing': 0}],
-                             ids=lambda x: f"Player 1 {x}")
-    @pytest.mark.parametrize("player_2", [{'max_depth': 0, 'randomizing': 20},
-                                          {'max_depth': 1, 'randomizing': 0}],
-                             ids=lambda x: f"Player 2 {x}")
+    @pytest.mark.parametrize("player_1", [EngineConfig(max_depth=0, temperature=0.2), EngineConfig(max_depth=1)],
+                             ids=lambda x: f"Player 1 {x.to_json()}")
+    @pytest.mark.parametrize("player_2", [EngineConfig(max_depth=0, temperature=0.2), EngineConfig(max_depth=1)],
+                             ids=lambda x: f"Player 2 {x.to_json()}")
     def test_ai_game(self, Board, player_1, player_2):
         """Test easy and smart AI combinations"""
         board = Board()
         print(f'\n{Board.__name__}')
-        difficulty_params = [player_1, player_2]
+        configs = [player_1, player_2]
         while True:
-            move = find_best_move(board, **difficulty_params[board.turn - 1])
+            move = find_best_move(board, **configs[board.turn - 1].search_settings())
             board = board.move(move)
             if board.is_win:
-                print(f"Player {board.last_turn} is winner!")
+                print(f"Player {board.winner} is winner!")
                 break
             elif board.is_draw:
                 print(f"Game drawn!")
                 break
 
+    def test_engine_config(self, Board):
+        """Config must be validated, saved as json and used by the search"""
+        config = EngineConfig(max_depth=2, time_budget_ms=1000, null_move=True, evaluation_cache_size=128)
+        assert EngineConfig.from_json(config.to_json()) == config
+        file = StringIO()
+        save_profiles({'Сложно': config, 'Легко': EngineConfig(temperature=0.2)}, file)
+        file.seek(0)
+        assert load_profiles(file) == {'Сложно': config, 'Легко': EngineConfig(temperature=0.2)}
+        for settings in ({'algorithm': 'minimax'}, {'max_depth': -1}, {'time_budget_ms': 0}, {'workers': 0},
+                         {'temperature': -1}, {'parallel': 'tree'}, {'randomizing': 5},
+                         {'algorithm': 'negamax', 'null_move': True},
+                         {'algorithm': 'mcts', 'late_move_reduction': True}):
+            with pytest.raises(ValueError):
+                EngineConfig.from_dict(settings)
+        with pytest.raises(ValueError):
+            config.replace(table_size=0)
+        board = Board()
+        for _ in range(4):
+            board = board.move(choice(board.legal_moves))
+        move = find_best_move(board, table=config.create_table(), evaluation_cache=config.create_evaluation_cache(),
+                              **config.search_settings())
+        assert move in board.legal_moves
+        # Lazy SMP keeps the shared table of the config between moves
+        config = EngineConfig(max_depth=1, workers=2, table_size=128)
+        table = config.create_table()
+        assert isinstance(table, SharedTranspositionTable) and table.size == 128
+        for _ in range(2):
+            move = find_best_move(board, table=table, **config.search_settings())
+            assert move in board.legal_moves
+        assert len(table) > 0
+        table.close()
+        assert not isinstance(config.replace(parallel='root').create_table(), SharedTranspositionTable)
+
     def test_wrong_moves(self, Board):
         """Try to make illegal move"""
         board = Board()
@@ -87,3 +132,449 @@ class TestGame:
             print(board)
             for move in bad_moves:
                 board.move(move)
+
+    def test_incremental_hash(self, Board):
+        """Hash updated by moves must be equal to the hash computed from scratch"""
+        board = Board()
+        board.hash_key
+        for _ in range(30):
+            if board.is_win or board.is_draw:
+                break
+            board = board.move(choice(board.legal_moves))
+            key = board.hash_key
+            board._field_hash = None
+            assert key == board.hash_key
+
+    def test_cached_state(self, Board):
+        """Terminal status must not change the board, it's computed once and updated by moves in place"""
+        board = Board()
+        for _ in range(200):
+            turn, key = board.turn, board.hash_key
+            moves = board.legal_moves
+            assert board.is_win == board.is_win
+            assert board.turn == turn and board.hash_key == key
+            assert board.legal_moves is moves
+            if board.is_win:
+                assert board.winner in (1, 2)
+                break
+            assert board.winner is None
+            if board.is_draw:
+                break
+            move = choice(moves)
+            if board.SUPPORTS_PUSH:
+                board.push(move)
+                assert set(board.legal_moves) == set(board.copy().legal_moves)
+                assert board.is_win == board.copy().is_win
+                board.pop()
+                assert set(board.legal_moves) == set(moves)
+            board = board.move(move)
+
+    def test_move_codes(self, Board):
+        """Codes of the legal moves must be different and decoded back to the moves"""
+        board = Board()
+        for _ in range(10):
+            if board.is_win or board.is_draw:
+                break
+            codes = [board.encode_move(move) for move in board.legal_moves]
+            assert len(set(codes)) == len(codes)
+            assert [board.decode_move(code) for code in codes] == board.legal_moves
+            board = board.move(choice(board.legal_moves))
+
+    def test_shared_pieces(self, Board):
+        """Pieces must not have __dict__ and immutable pieces must be shared by cells with the same code"""
+        board = Board()
+        for _ in range(6):
+            board = board.move(choice(board.legal_moves))
+        field = board.field
+        pieces = {}
+        for x in range(field.shape[0]):
+            for y in range(field.shape[1]):
+                piece = field[x, y]
+                assert not hasattr(piece, '__dict__')
+                assert piece.value == board.get_value(x, y)
+                pieces.setdefault(type(piece), {}).setdefault(piece.value, set()).add(id(piece))
+        if board.to_piece(0) is board.to_piece(0):
+            # Immutable pieces are created once for every value
+            assert all(len(ids) == 1 for by_value in pieces.values() for ids in by_value.values())
+
+    def test_binary_state(self, Board):
+        """Board restored from bytes must have the same state, moves and evaluation as the original board"""
+        board = Board()
+        for _ in range(60):
+            data = board.to_bytes()
+            restored = type(board).from_bytes(data)
+            assert restored.to_bytes() == data
+            assert restored.hash_key == board.hash_key
+            assert restored.evaluation_key == board.evaluation_key
+            assert set(restored.legal_moves) == set(board.legal_moves)
+            assert (restored.is_win, restored.is_draw, restored.winner) == (board.is_win, board.is_draw, board.winner)
+            if board.is_win or board.is_draw:
+                break
+            move = choice(board.legal_moves)
+            # Moves of the restored board are the same
+            restored, board = restored.move(move), board.move(move)
+            assert restored.to_bytes() == board.to_bytes()
+            assert restored.evaluate(1) == board.evaluate(1) and restored.evaluate(2) == board.evaluate(2)
+        with pytest.raises(ValueError):
+            type(board).from_bytes(board.to_bytes()[:-1])
+
+    def test_geometry(self, Board):
+        """Shared tables must give the same neighbours as bounds checks and must be built once per size"""
+        board = Board()
+        size = board.geometry.size
+        assert board.geometry is Geometry.get(size)
+        for x in range(size):
+            for y in range(size):
+                for area_size in (1, 2):
+                    assert set(board.get_neighbours((x, y), area_size)) == {
+                        (i, j) for i in range(x - area_size, x + area_size + 1)
+                        for j in range(y - area_size, y + area_size + 1) if 0 <= i < size and 0 <= j < size}
+                for (dx, dy), ray in zip(Geometry.DIRECTIONS, board.geometry.rays[x][y]):
+                    assert all(ray[k] == (x + (k + 1) * dx, y + (k + 1) * dy) for k in range(len(ray)))
+                    assert not 0 <= x + (len(ray) + 1) * dx < size or not 0 <= y + (len(ray) + 1) * dy < size
+
+    @pytest.mark.parametrize("budget", [{'time_budget_ms': 300}, {'node_budget': 500}],
+                             ids=lambda x: f"Budget {x}")
+    def test_search_budget(self, Board, budget):
+        """Iterative deepening must return a legal move within the budget"""
+        board = Board()
+        for _ in range(6):
+            board = board.move(choice(board.legal_moves))
+        start = time()
+        move = find_best_move(board, max_depth=20, **budget)
+        assert move in board.legal_moves
+        assert time() - start < 3
+
+    def test_order_moves(self, Board):
+        """Static order of moves must keep all legal moves"""
+        board = Board()
+        for _ in range(10):
+            if board.is_win or board.is_draw:
+                break
+            moves = board.legal_moves
+            assert sorted(board.order_moves(list(moves))) == sorted(moves)
+            board = board.move(choice(moves))
+
+    def test_negamax_search(self, Board):
+        """Principal variation search must find the same best scores as alphabeta"""
+        board = Board()
+        for _ in range(4):
+            board = board.move(choice(board.legal_moves))
+        move = find_best_move(board, max_depth=2, algorithm='negamax')
+        assert move in board.legal_moves
+        moves = board.order_moves(sorted(board.legal_moves))
+        _, root_scores = search_root(board, moves, 2, SearchContext())
+        _, best_scores, _ = search_root_pvs(board.copy(), moves, 2, SearchContext())
+        assert best_scores == max(root_scores.values())
+
+    @pytest.mark.parametrize("settings", [{'max_depth': 2}, {'max_depth': 2, 'algorithm': 'negamax'},
+                                          {'algorithm': 'mcts', 'playouts': 20}],
+                             ids=lambda x: f"Settings {x}")
+    def test_search_stats(self, Board, settings):
+        """Statistics of the search must be returned with the move and exported as json lines"""
+        board = Board()
+        for _ in range(4):
+            board = board.move(choice(board.legal_moves))
+        move, stats = find_best_move(board, return_stats=True, **settings)
+        assert move in board.legal_moves
+        assert stats.nodes > 0
+        file = StringIO()
+        stats.write(file, difficulty='test')
+        stats.write(file, difficulty='test')
+        lines = file.getvalue().splitlines()
+        assert len(lines) == 2
+        record = json.loads(lines[0])
+        assert record['game'] == Board.__name__
+        assert record['difficulty'] == 'test'
+        assert record['nodes'] == stats.nodes
+        # Infinite scores of won games aren't valid json, they are written as null
+        stats.add_iteration(3, 0, 0.0, float('-inf'))
+        assert json.loads(stats.to_json())['iterations'][-1]['scores'] is None
+        stats.iterations.pop()
+        if settings.get('algorithm') != 'mcts':
+            assert stats.leaves > 0
+            assert stats.depth == 2
+            assert 0 <= stats.table_hit_rate <= 1
+
+    def test_evaluation_cache(self, Board):
+        """Cached evaluations must be equal to evaluations of the board and must not change the search"""
+        cache = EvaluationCache(64)
+        board = Board()
+        for _ in range(30):
+            board = board.move(choice(board.legal_moves))
+            if board.is_win or board.is_draw:
+                break
+            for player in (1, 2):
+                assert cache.evaluate(board, player) == board.evaluate(player)
+                assert cache.evaluate(board, player) == board.evaluate(player)
+        assert len(cache) <= 64
+        assert cache.hits > 0 and cache.misses > 0
+        if board.is_win or board.is_draw:
+            return
+        cache = EvaluationCache()
+        move = find_best_move(board, max_depth=2, rng=Random(1))
+        cached_move, stats = find_best_move(board, max_depth=2, rng=Random(1), evaluation_cache=cache,
+                                            return_stats=True)
+        assert cached_move == move
+        assert stats.evaluation_misses == cache.misses > 0
+        assert 0 <= stats.evaluation_hit_rate <= 1
+
+    @pytest.mark.parametrize("settings", [{'max_depth': 30, 'time_budget_ms': 60000},
+                                          {'max_depth': 30, 'algorithm': 'negamax'},
+                                          {'algorithm': 'mcts', 'time_budget_ms': 60000}],
+                             ids=lambda x: f"Settings {x}")
+    def test_search_cancel(self, Board, settings):
+        """Cancelled search must stop soon and return the best move found so far"""
+        board = Board()
+        for _ in range(4):
+            board = board.move(choice(board.legal_moves))
+        search = SearchHandle(board, **settings).start()
+        search.wait(0.3)
+        start = time()
+        move = search.stop()
+        assert time() - start < 2
+        assert search.is_done
+        assert move in board.legal_moves
+
+    def test_ponder(self, Board):
+        """Search on the opponent's time must make the next search of the player faster"""
+        rnd = Random(1)
+        board = Board()
+        for _ in range(4):
+            board = board.move(rnd.choice(board.legal_moves))
+        player = board.last_turn
+        table = TranspositionTable()
+        search = ponder(board, player, max_depth=2, table=table, time_budget_ms=60000)
+        search.wait()
+        assert search.board.turn == player
+        _, cold_stats = find_best_move(search.board, max_depth=2, rng=Random(1), return_stats=True)
+        move, warm_stats = find_best_move(search.board, max_depth=2, table=table, rng=Random(1), return_stats=True)
+        assert move in search.board.legal_moves
+        if len(search.board.legal_moves) < 2:
+            # Forced move is found at once by both searches
+            assert warm_stats.nodes <= cold_stats.nodes
+        else:
+            assert warm_stats.nodes < cold_stats.nodes
+
+    @pytest.mark.parametrize("algorithm", ['alphabeta', 'negamax'])
+    def test_quiescence(self, Board, algorithm):
+        """Quiescence search must estimate quiet positions statically and return a legal move"""
+        board = Board()
+        for _ in range(20):
+            board = board.move(choice(board.legal_moves))
+            if board.is_win or board.is_draw:
+                break
+            if not any(board.is_forcing(move) for move in board.legal_moves):
+                context = SearchContext(quiescence_depth=4)
+                scores = quiescence(board, board.last_turn, float('-inf'), float('inf'), context, 1)
+                assert scores == board.evaluate(board.last_turn)
+                assert context.nodes == 1
+        if not (board.is_win or board.is_draw):
+            move = find_best_move(board, max_depth=1, quiescence_depth=2, algorithm=algorithm)
+            assert move in board.legal_moves
+
+    @pytest.mark.parametrize("algorithm", ['alphabeta', 'negamax'])
+    def test_analyse(self, Board, algorithm):
+        """Analysis must return the best moves with exact scores and legal principal variations"""
+        board = Board()
+        for _ in range(4):
+            board = board.move(choice(board.legal_moves))
+        analysis = analyse(board, max_depth=2, count=3, algorithm=algorithm)
+        assert len(analysis) == min(3, len(board.legal_moves))
+        assert [line.scores for line in analysis] == sorted((line.scores for line in analysis), reverse=True)
+        for line in analysis:
+            assert line.pv[0] == line.move
+            pv_board = board
+            for move in line.pv:
+                assert move in pv_board.legal_moves
+                pv_board = pv_board.move(move)
+            assert line.scores == alphabeta(board.move(line.move), board.turn, 2)
+
+    def test_opening_book(self, Board, tmp_path):
+        """Book moves must be legal and returned by the search, positions out of the book must be searched"""
+        path = str(tmp_path / 'test.book')
+        assert build_book([Board()], path, plies=2, max_depth=1) > 0
+        book = OpeningBook(path)
+        board = Board()
+        moves = book.get_moves(board)
+        assert moves
+        assert all(move in board.legal_moves and weight > 0 for move, weight in moves)
+        move, stats = find_best_move(board, max_depth=1, book=book, return_stats=True)
+        assert move == stats.book_move
+        assert move in [move for move, _ in moves]
+        for _ in range(3):
+            board = board.move(choice(board.legal_moves))
+        if not (board.is_win or board.is_draw):
+            assert book.get_moves(board) == []
+            move, stats = find_best_move(board, max_depth=1, book=book, return_stats=True)
+            assert stats.book_move is None
+            assert move in board.legal_moves
+
+    def test_temperature(self, Board):
+        """Sampling of the move must be reproduced by the seeded generator and zero temperature gives the best move"""
+        board = Board()
+        for _ in range(4):
+            board = board.move(choice(board.legal_moves))
+        moves = [find_best_move(board, max_depth=1, temperature=0.2, rng=Random(seed)) for seed in range(5)]
+        assert moves == [find_best_move(board, max_depth=1, temperature=0.2, rng=Random(seed)) for seed in range(5)]
+        assert all(move in board.legal_moves for move in moves)
+        best = analyse(board, max_depth=1, count=1)[0]
+        move = find_best_move(board, max_depth=1, temperature=1e-9, rng=Random(0))
+        assert alphabeta(board.move(move), board.turn, 1) == best.scores
+        # Only moves close to the best one get exact scores, the other moves are never sampled
+        exact_scores = {move: alphabeta(board.move(move), board.turn, 1) for move in board.legal_moves}
+        margin = (best.scores - min(exact_scores.values())) / 2 or 1
+        moves = board.order_moves(sorted(board.legal_moves))
+        _, root_scores = search_root_sampling(board, moves, 1, margin, SearchContext(TranspositionTable()))
+        for move, scores in exact_scores.items():
+            assert root_scores[move] == (scores if scores > best.scores - margin else float('-inf'))
+
+    @pytest.mark.parametrize("parallel", ['root', 'lazy'])
+    def test_parallel_search(self, Board, parallel):
+        """Parallel search (split of root moves or Lazy SMP) must return a legal move"""
+        board = Board()
+        for _ in range(4):
+            board = board.move(choice(board.legal_moves))
+        move = find_best_move(board, max_depth=1, workers=2, parallel=parallel)
+        assert move in board.legal_moves
+        if parallel == 'root':
+            # Split of the root moves must find the same best scores as the serial search
+            moves = board.order_moves(sorted(board.legal_moves))
+            _, root_scores = search_root(board, moves, 2, SearchContext())
+            _, parallel_scores = search_root_parallel(board, moves, 2, SearchContext(TranspositionTable()), workers=2)
+            assert max(parallel_scores.values()) == max(root_scores.values())
+
+    def test_parallel_stats(self, Board):
+        """Nodes of the workers must be counted once in statistics of the parallel search"""
+        board = Board()
+        for _ in range(4):
+            board = board.move(choice(board.legal_moves))
+        # Iteration counts the nodes of the context, which include the nodes of the workers
+        move, stats = find_best_move(board, max_depth=2, workers=3, parallel='root', return_stats=True)
+        assert stats.nodes == sum(iteration['nodes'] for iteration in stats.iterations) > 0
+        context = SearchContext(TranspositionTable())
+        search_lazy_smp(board, 2, context, 3)
+        main_nodes = sum(iteration['nodes'] for iteration in context.stats.iterations)
+        # Nodes of the helpers are added to the context, but not to the merged statistics
+        assert context.nodes > main_nodes
+        assert context.stats.nodes == 0
+
+    def test_shared_table(self, Board):
+        """Shared table must keep entries with move codes of the game and ignore torn entries"""
+        board = Board()
+        table = SharedTranspositionTable(64)
+        other = SharedTranspositionTable(64, table.name)
+        move = board.encode_move(choice(board.legal_moves))
+        table.store(board.hash_key, 3, -1.5, LOWER, move)
+        assert other.get(board.hash_key) == (board.hash_key, 3, -1.5, LOWER, move, 0)
+        # Deeper result of the other position isn't replaced in the same search
+        other_key = board.hash_key ^ 64
+        table.store(other_key, 2, 1, EXACT)
+        assert other.lookup(board.hash_key, 3, -3, -2) == (-1.5, move)
+        entries = table._entries
+        entries[board.hash_key % 64]['scores'] ^= 1
+        assert other.get(board.hash_key) is None
+        other.close()
+        table.close()
+
+    def test_mcts_search(self, Board):
+        """Monte Carlo Tree Search must return a legal move and reuse the tree on the next move"""
+        board = Board()
+        tree = MonteCarloTreeSearch()
+        for _ in range(2):
+            move = find_best_move(board, algorithm='mcts', playouts=20, tree=tree)
+            assert move in board.legal_moves
+            board = board.move(move)
+            if board.is_win or board.is_draw:
+                break
+        if board.is_win or board.is_draw:
+            return
+        # Search with the seeded generator is reproduced (the given tree gets the generator too)
+        moves = [find_best_move(board, algorithm='mcts', playouts=20, rng=Random(seed)) for seed in range(3)]
+        assert moves == [find_best_move(board, algorithm='mcts', playouts=20, rng=Random(seed)) for seed in range(3)]
+        tree = MonteCarloTreeSearch()
+        assert find_best_move(board, algorithm='mcts', playouts=20, tree=tree, rng=Random(0)) == moves[0]
+        # Unfinished playout is won by the player with better estimation than the opponent's one
+        scores = board.evaluate(board.turn) - board.evaluate(board.last_turn)
+        winner = board.turn if scores > 0 else board.last_turn if scores < 0 else 0
+        assert MonteCarloTreeSearch(playout_depth=0).playout(board) == winner
+
+    def test_push_pop(self, Board):
+        """Moves made in place must give the same states as copying moves and must be undone by pop"""
+        board = Board()
+        board.hash_key
+        states = []
+        while len(states) < 30 and not (board.is_win or board.is_draw):
+            move = choice(board.legal_moves)
+            states.append((board.hash_key, sorted(board.legal_moves), str(board)))
+            moved_board = board.move(move)
+            board.push(move)
+            assert board.hash_key == moved_board.hash_key
+            assert sorted(board.legal_moves) == sorted(moved_board.legal_moves)
+            assert str(board) == str(moved_board)
+        for state in reversed(states):
+            board.pop()
+            assert (board.hash_key, sorted(board.legal_moves), str(board)) == state
+
+    def test_null_move(self, Board):
+        """Null move must be undone by pop and must not be used in games with zugzwang"""
+        board = Board()
+        states = []
+        while len(states) < 20 and not (board.is_win or board.is_draw):
+            if Board is Hare_and_wolves:
+                assert not board.can_null_move
+            if board.can_null_move:
+                states.append((board.hash_key, board.turn, sorted(board.legal_moves), str(board)))
+                board.push_null()
+                assert str(board) == states[-1][3]
+            states.append((board.hash_key, board.turn, sorted(board.legal_moves), str(board)))
+            board.push(choice(board.legal_moves))
+        for state in reversed(states):
+            board.pop()
+            assert (board.hash_key, board.turn, sorted(board.legal_moves), str(board)) == state
+
+    # Tolerance is a small step of the game's evaluation: two discs of Reversi, a longer path of Talpa,
+    # a line of two stones in Five in a row
+    @pytest.mark.parametrize("Game, tolerance", [(Reversi, 2), (Talpa, 6), (Five_in_a_row, 200)],
+                             ids=lambda x: f"Game {x.__name__}" if isinstance(x, type) else f"Tolerance {x}")
+    @pytest.mark.parametrize("pruning", [Pruning(null_move=True), Pruning(late_move_reduction=True)],
+                             ids=lambda x: f"Null move {x.null_move}")
+    def test_pruning_strength(self, Game, tolerance, pruning):
+        """Moves found with forward pruning must be almost as good as moves of the full search"""
+        rnd = Random(1)
+        for _ in range(2):
+            board = Game(size=8) if Game is not Five_in_a_row else Game()
+            for _ in range(8):
+                board = board.move(rnd.choice(board.legal_moves))
+            full_move = find_best_move(board, max_depth=3, rng=Random(1))
+            move = find_best_move(board, max_depth=3, rng=Random(1), pruning=pruning)
+            # Exact scores of the moves by the full search of the same depth
+            full_scores = alphabeta(board.move(full_move), board.turn, 3)
+            scores = alphabeta(board.move(move), board.turn, 3)
+            assert full_scores - scores <= tolerance
+
+    @pytest.mark.parametrize("Game", [Reversi, Flume], ids=lambda x: f"Game {x.__name__}")
+    def test_endgame_solver(self, Game):
+        """Solver must find the exact result of the endgame, the same as the search to the end"""
+        def final_scores(board, player):
+            if board.is_win or not board.legal_moves:
+                return board.final_scores(player)
+            results = [final_scores(board.move(move), player) for move in board.legal_moves]
+            return max(results) if board.turn == player else min(results)
+
+        rnd = Random(1)
+        for _ in range(2):
+            board = Game(size=7)
+            while board.empty_count > 7 and board.legal_moves:
+                board = board.move(rnd.choice(board.legal_moves))
+            if board.is_win or not board.legal_moves:
+                continue
+            best_scores = max(final_scores(board.move(move), board.turn) for move in board.legal_moves)
+            move, stats = find_best_move(board, max_depth=1, endgame_empties=7, return_stats=True)
+            assert stats.endgame_scores == best_scores
+            assert final_scores(board.move(move), board.turn) == best_scores
+            move, scores = solve_endgame(board, exact=False)
+            assert scores == (best_scores > 0) - (best_scores < 0)
+            result = final_scores(board.move(move), board.turn)
+            assert (result > 0) - (result < 0) == scores
+        assert find_best_move(Game(), max_depth=0, endgame_empties=7, return_stats=True)[1].endgame_scores is None